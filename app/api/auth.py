@@ -21,9 +21,7 @@ async def telegram_auth(
     if not profiles_service.verify_telegram_hash(telegram_user_data):
         raise InvalidTelegramDataException
 
-    user = await profiles_service.get_user_by_telegram_id(telegram_user_data.id)
-    if not user:
-        user = await profiles_service.create_user_with_telegram_user_data(telegram_user_data)
+    user = await profiles_service.login_telegram_user(telegram_user_data)
 
     access_token = profiles_service.create_access_token(user.user_id)
 
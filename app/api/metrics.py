@@ -0,0 +1,35 @@
+import os
+
+from fastapi import APIRouter, Depends
+
+from app.brokers.consumer import KafkaConsumer, get_kafka_consumer
+from app.brokers.producer import KafkaProducer, get_kafka_producer
+from app.database import get_pool_stats
+from app.interfaces.repositories import ProfilesCacheRedisRepositoryInterface, ProfilesLocalCacheInterface
+from app.repositories.profiles_cache import get_profiles_cache_redis_repository
+from app.repositories.profiles_local_cache import get_profiles_local_cache
+from app.services.outbox_relay import get_outbox_relay_stats
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@router.get("")
+async def get_metrics(
+        cache_repository: ProfilesCacheRedisRepositoryInterface = Depends(get_profiles_cache_redis_repository),
+        local_cache: ProfilesLocalCacheInterface = Depends(get_profiles_local_cache),
+        kafka_consumer: KafkaConsumer = Depends(get_kafka_consumer),
+        kafka_producer: KafkaProducer = Depends(get_kafka_producer),
+) -> dict:
+    """Счётчики текущего воркера."""
+    return {
+        "pid": os.getpid(),
+        "profile_cache": cache_repository.get_stats(),
+        "profile_local_cache": local_cache.get_stats(),
+        "postgres_pool": get_pool_stats(),
+        "kafka_consumer": kafka_consumer.get_stats(),
+        "kafka_producer": kafka_producer.get_stats(),
+        "outbox_relay": get_outbox_relay_stats(),
+    }
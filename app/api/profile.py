@@ -1,13 +1,14 @@
 import uuid
 from typing import Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi import APIRouter, Depends, File, Query, Response, UploadFile, status
 
+from app.configs.main import settings
 from app.exceptions.common import NotFoundException
 from app.exceptions.profiles import UserNotFoundException
-from app.filters.base import BaseFilter
+from app.filters.likes import LikesFilter
 from app.interfaces.services import ProfilesServiceInterface
-from app.schemas.likes import LikeCreateSchema, LikeSchema
+from app.schemas.likes import LikeCreateSchema, LikeSchema, SkipCreateSchema
 from app.schemas.users import UserSchema, UserUpdatePhotoSchema, UserUpdateSchema
 from app.services.profiles import get_profiles_service
 from app.utils import get_current_user_id
@@ -52,14 +53,27 @@ async def like_profile(
     return like
 
 
+@router.post("/skip", status_code=status.HTTP_204_NO_CONTENT)
+async def skip_profile(
+        skip_data: SkipCreateSchema,
+        user_id: uuid.UUID = Depends(get_current_user_id),
+        auth_service: ProfilesServiceInterface = Depends(get_profiles_service),
+) -> None:
+    await auth_service.skip_user(user_id, skip_data)
+
+
 @router.get("/likes")
 async def get_my_likes(
+        response: Response,
         user_id: uuid.UUID = Depends(get_current_user_id),
-        filters: BaseFilter = Depends(),
+        filters: LikesFilter = Depends(),
         auth_service: ProfilesServiceInterface = Depends(get_profiles_service),
 ) -> list[LikeSchema]:
-    likes = await auth_service.get_my_likes(user_id, filters)
-    return likes
+    """Курсор следующей страницы отдаётся в заголовке X-Next-Cursor, на последней странице его нет."""
+    likes_page = await auth_service.get_my_likes(user_id, filters)
+    if likes_page.next_cursor:
+        response.headers["X-Next-Cursor"] = likes_page.next_cursor
+    return likes_page.likes
 
 
 @router.get("/get_user_for_action")
@@ -69,13 +83,22 @@ async def get_user_for_action(
 ) -> Optional[UserSchema]:
     user_id_for_action = await auth_service.get_user_for_action(user_id)
     if not user_id_for_action:
-        user = await auth_service.get_user_by_id(user_id)
-        await auth_service.add_users_queue(user)
-        user_id_for_action = await auth_service.get_user_for_action(user_id)
+        return None
     user_for_action = await auth_service.get_user_by_id(user_id_for_action)
     return user_for_action
 
 
+@router.get("/feed")
+async def get_feed(
+        count: int = Query(10, ge=1, le=settings.feed.FEED_MAX_COUNT),
+        user_id: uuid.UUID = Depends(get_current_user_id),
+        auth_service: ProfilesServiceInterface = Depends(get_profiles_service),
+) -> list[UserSchema]:
+    user_ids_for_action = await auth_service.get_users_for_action(user_id, count)
+    users_for_action = await auth_service.get_users_by_ids(user_ids_for_action)
+    return users_for_action
+
+
 @router.post("/update_photo")
 async def update_photo(
         file: UploadFile = File(...),
@@ -1,17 +1,39 @@
+import asyncio
 import json
 import logging
 from typing import AsyncGenerator, Optional
 
-from aiokafka import AIOKafkaConsumer, ConsumerRecord
-from aiokafka.errors import KafkaError
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, ConsumerRecord, TopicPartition
+from aiokafka.errors import ConsumerStoppedError, KafkaError
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
+from app.brokers.pool import KeyedWorkerPool
+from app.brokers.recent_likes import RecentLikesCache
 from app.configs.main import settings
 from app.exceptions.profiles import MatchExistsException
 from app.interfaces.services import ProfilesServiceInterface
 from app.logger import get_logger
 from app.models.likes import LikeStatusEnum
+from app.schemas.likes import LikeEventSchema
 from app.schemas.matches import MatchCreateSchema
 from app.services.profiles import get_profiles_service
+from app.utils import get_pair_key
+
+# Ошибки, после которых пачку есть смысл прочитать заново: соединение, таймаут, недоступный брокер.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError, OSError, KafkaError)
+
+
+class RecentLikesRebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, recent_likes: RecentLikesCache):
+        self.recent_likes = recent_likes
+
+    async def on_partitions_revoked(self, revoked: set[TopicPartition]) -> None:
+        self.recent_likes.drop(revoked)
+
+    async def on_partitions_assigned(self, assigned: set[TopicPartition]) -> None:
+        pass
 
 
 class KafkaConsumer:
@@ -23,17 +45,36 @@ class KafkaConsumer:
         return cls._instance
 
     def __init__(
-            self, kafka_url: str, group_id: str, profiles_service: ProfilesServiceInterface, logger: logging.Logger
+            self,
+            kafka_url: str,
+            group_id: str,
+            profiles_service: ProfilesServiceInterface,
+            logger: logging.Logger,
+            concurrency: int,
+            queue_size: int,
+            batch_mode: bool,
+            max_records: int,
+            batch_timeout_ms: int,
+            recent_likes_size: int,
     ):
         if not hasattr(self, 'consumer'):
             self.consumer = AIOKafkaConsumer(
                 bootstrap_servers=kafka_url,
                 group_id=group_id,
-                enable_auto_commit=True
+                # В пакетном режиме оффсеты коммитятся вручную после обработки пачки.
+                enable_auto_commit=not batch_mode,
             )
             self.profiles_service = profiles_service
             self.logger = logger
             self.subscribed_topics = []
+            self.pool = KeyedWorkerPool(self._process_like, logger, concurrency, queue_size)
+            self.batch_mode = batch_mode
+            self.max_records = max_records
+            self.batch_timeout_ms = batch_timeout_ms
+            self.batches = 0
+            self.batch_failures = 0
+            self.skipped = 0
+            self.recent_likes = RecentLikesCache(recent_likes_size)
 
     async def start(self) -> None:
         await self.consumer.start()
@@ -45,7 +86,7 @@ class KafkaConsumer:
 
     async def subscribe(self, topics: list[str]) -> None:
         self.subscribed_topics.extend(topics)
-        self.consumer.subscribe(topics)
+        self.consumer.subscribe(topics, listener=RecentLikesRebalanceListener(self.recent_likes))
 
     async def consume_messages(self) -> AsyncGenerator[ConsumerRecord, None]:
         """Consume messages from subscribed topics."""
@@ -56,33 +97,153 @@ class KafkaConsumer:
             self.logger.error(f"Error while consuming messages: {e}")
 
     async def process_messages(self) -> None:
-        """Обрабатываем сообщения из Kafka."""
-        async for message in self.consume_messages():
+        """
+        Обрабатываем сообщения из Kafka пачками либо пулом воркеров. В пуле лайки одной пары идут к одному
+        воркеру по порядку, разные пары обрабатываются параллельно в пределах concurrency.
+        """
+        if self.batch_mode:
+            await self.process_batches()
+            return
+        self.pool.start()
+        try:
+            async for message in self.consume_messages():
+                if message.topic == "likes":
+                    data = self._decode_like(message)
+                    if data:
+                        partition = TopicPartition(message.topic, message.partition)
+                        await self.pool.submit(get_pair_key(data["user_id"], data["liked_user_id"]), (partition, data))
+        finally:
+            await self.pool.close()
+
+    async def process_batches(self) -> None:
+        """
+        Пакетный режим: пачка из getmany обрабатывается одним запросом, оффсеты коммитятся только после
+        успешной обработки. При временной ошибке БД или Kafka партиции откатываются к началу пачки и она
+        читается заново, поэтому доставка at-least-once. Невалидные сообщения и лайки, которые не
+        обрабатываются и по одному, пишутся в лог и пропускаются, чтобы не держать партицию.
+        """
+        while self.consumer:
+            try:
+                batch = await self.consumer.getmany(timeout_ms=self.batch_timeout_ms, max_records=self.max_records)
+            except ConsumerStoppedError:
+                return
+            except KafkaError as e:
+                self.logger.error(f"Error while consuming messages: {e}")
+                continue
+            if not batch:
+                continue
+            try:
+                await self._process_batch([message for messages in batch.values() for message in messages])
+                await self.consumer.commit()
+                self.batches += 1
+            except Exception as e:
+                self.batch_failures += 1
+                self.logger.error(f"Failed to process batch, rewinding to its first offsets: {e}")
+                self._rewind(batch)
+                await asyncio.sleep(self.batch_timeout_ms / 1000)
+
+    def _rewind(self, batch: dict[TopicPartition, list[ConsumerRecord]]) -> None:
+        """
+        Возвращает позицию партиций на первое сообщение пачки. seek_to_committed не подходит: у новой
+        группы закоммиченного оффсета нет, и пачка была бы пропущена. Партиции, ушедшие при ребалансе,
+        пропускаются — их перечитает новый владелец с закоммиченного оффсета.
+        """
+        try:
+            assigned = self.consumer.assignment()
+            for partition, messages in batch.items():
+                if partition in assigned:
+                    self.consumer.seek(partition, messages[0].offset)
+        except Exception as e:
+            self.logger.error(f"Failed to rewind partitions after failed batch: {e}")
+
+    def get_stats(self) -> dict:
+        if self.batch_mode:
+            stats = {"batches": self.batches, "batch_failures": self.batch_failures}
+        else:
+            stats = self.pool.get_stats()
+        return {**stats, "skipped": self.skipped, "recent_likes": self.recent_likes.get_stats()}
+
+    async def _process_batch(self, messages: list[ConsumerRecord]) -> None:
+        likes = []
+        for message in messages:
             if message.topic == "likes":
-                data = self._decode_message(message)
-                user_id = data["user_id"]
-                liked_user_id = data["liked_user_id"]
-                like_exists = await self.profiles_service.check_mutual_like(user_id, liked_user_id)
-                if like_exists:
-                    try:
-                        match_data = MatchCreateSchema(
-                            user1_id=user_id,
-                            user2_id=liked_user_id,
-                        )
-                        await self.profiles_service.create_match(match_data)
-                        await self.profiles_service.update_like_status(data["like_id"], LikeStatusEnum.match)
-                        await self.profiles_service.update_like_status(like_exists.like_id, LikeStatusEnum.match)
-                    except MatchExistsException as e:
-                        self.logger.error(f"Failed to create match: {e}")
+                data = self._decode_like(message)
+                if data:
+                    likes.append((TopicPartition(message.topic, message.partition), data))
+        if not likes:
+            return
+        try:
+            await self._resolve_likes(likes)
+        except Exception as e:
+            if self._is_transient(e):
+                raise
+            # Пачка целиком не проходит и не пройдёт при повторе: лайки разбираются по одному, не прошедшие
+            # пропускаются.
+            self.logger.error(f"Failed to resolve batch of {len(likes)} likes, resolving them one by one: {e}")
+            for item in likes:
+                try:
+                    await self._process_like(item)
+                except Exception as like_error:
+                    if self._is_transient(like_error):
+                        raise
+                    self.skipped += 1
+                    self.logger.error(f"Like {item[1]} skipped: {like_error}")
+
+    async def _resolve_likes(self, likes: list[tuple[TopicPartition, dict]]) -> None:
+        # В БД идут только лайки, исход которых не известен по кэшу партиции.
+        pairs = [
+            (data["user_id"], data["liked_user_id"]) for partition, data in likes
+            if not self.recent_likes.is_resolved(partition, data["user_id"], data["liked_user_id"])
+        ]
+        matches = await self.profiles_service.resolve_mutual_likes(pairs) if pairs else []
+        matched_keys = {get_pair_key(match.user1_id, match.user2_id) for match in matches}
+        for partition, data in likes:
+            self.recent_likes.remember(
+                partition,
+                data["user_id"],
+                data["liked_user_id"],
+                matched=get_pair_key(data["user_id"], data["liked_user_id"]) in matched_keys,
+            )
+        for match in matches:
+            self.logger.info(f"Match {match.match_id} created for users {match.user1_id}, {match.user2_id}")
+        self.logger.info(f"Resolved {len(likes)} likes, {len(pairs)} checked in DB, {len(matches)} matches created")
+
+    async def _process_like(self, item: tuple[TopicPartition, dict]) -> None:
+        partition, data = item
+        if self.recent_likes.is_resolved(partition, data["user_id"], data["liked_user_id"]):
+            return
+        match = await self.profiles_service.resolve_mutual_like(data["user_id"], data["liked_user_id"])
+        self.recent_likes.remember(partition, data["user_id"], data["liked_user_id"], matched=match is not None)
+        if match:
+            self.logger.info(f"Match {match.match_id} created for users {match.user1_id}, {match.user2_id}")
 
     def _decode_message(self, message: ConsumerRecord) -> dict:
         try:
             data = json.loads(message.value.decode("utf-8"))
             self.logger.info(f"Received message from topic {message.topic}: {data}")
             return data
-        except json.JSONDecodeError as e:
+        except (ValueError, AttributeError) as e:
             self.logger.error(f"Failed to decode JSON: {e} | Raw message: {message.value}")
 
+    def _decode_like(self, message: ConsumerRecord) -> Optional[dict]:
+        """Лайк с проверенными id; битое сообщение пропускается, иначе оно останавливало бы партицию."""
+        data = self._decode_message(message)
+        if data is None:
+            self.skipped += 1
+            return None
+        try:
+            like = LikeEventSchema.model_validate(data)
+        except ValidationError as e:
+            self.skipped += 1
+            self.logger.error(f"Invalid like message at {message.topic}:{message.partition}:{message.offset} "
+                              f"skipped: {e.errors()} | Raw message: {message.value}")
+            return None
+        return {"user_id": str(like.user_id), "liked_user_id": str(like.liked_user_id)}
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        return isinstance(error, TRANSIENT_ERRORS) or (isinstance(error, DBAPIError) and error.connection_invalidated)
+
 
 def get_kafka_consumer() -> KafkaConsumer:
     profiles_service = get_profiles_service()
@@ -93,4 +254,10 @@ def get_kafka_consumer() -> KafkaConsumer:
         group_id="profiles",
         profiles_service=profiles_service,
         logger=logger,
+        concurrency=settings.kafka.KAFKA_CONSUMER_CONCURRENCY,
+        queue_size=settings.kafka.KAFKA_CONSUMER_QUEUE_SIZE,
+        batch_mode=settings.kafka.KAFKA_CONSUMER_BATCH_MODE,
+        max_records=settings.kafka.KAFKA_CONSUMER_MAX_RECORDS,
+        batch_timeout_ms=settings.kafka.KAFKA_CONSUMER_BATCH_TIMEOUT_MS,
+        recent_likes_size=settings.kafka.KAFKA_CONSUMER_RECENT_LIKES_SIZE,
     )
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import zlib
+from typing import Any, Awaitable, Callable
+
+
+class KeyedWorkerPool:
+    """
+    Пул asyncio-воркеров с очередью на каждого. Сообщения с одним ключом всегда попадают к одному воркеру
+    и обрабатываются по порядку, разные ключи — параллельно. Очереди ограничены: когда очередь воркера
+    заполнена, submit ждёт, и чтение из Kafka притормаживает вместе с обработкой.
+    """
+
+    def __init__(
+            self,
+            handler: Callable[[Any], Awaitable[None]],
+            logger: logging.Logger,
+            concurrency: int,
+            queue_size: int,
+    ):
+        self.handler = handler
+        self.logger = logger
+        self.concurrency = concurrency
+        self.queues: list[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in range(concurrency)]
+        self.workers: list[asyncio.Task] = []
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if not self.workers:
+            self.workers = [asyncio.create_task(self._work(queue)) for queue in self.queues]
+
+    async def submit(self, key: str, item: Any) -> None:
+        # crc32, а не hash(): распределение по воркерам одинаково между перезапусками.
+        queue = self.queues[zlib.crc32(key.encode()) % self.concurrency]
+        await queue.put(item)
+        self.submitted += 1
+
+    async def join(self) -> None:
+        """Ждёт обработки всего, что уже передано в пул."""
+        await asyncio.gather(*(queue.join() for queue in self.queues))
+
+    async def close(self) -> None:
+        if not self.workers:
+            return
+        await self.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def get_stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queued": sum(queue.qsize() for queue in self.queues),
+        }
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                self.logger.error(f"Failed to process message {item}: {e}")
+            finally:
+                queue.task_done()
@@ -1,10 +1,31 @@
+import asyncio
 import json
-from typing import Optional
+import logging
+import random
+import time
+import zlib
+from typing import Literal, Optional, Union
 
 from aiokafka import AIOKafkaProducer
+from aiokafka.partitioner import DefaultPartitioner
 
 from app.configs.main import settings
 from app.interfaces.brokers import KafkaProducerInterface
+from app.logger import get_logger
+
+
+def crc32_partitioner(key: Optional[bytes], all_partitions: list[int], available: list[int]) -> int:
+    """Как consistent-партиционер librdkafka: ключи ложатся в те же партиции, что и у клиентов на librdkafka."""
+    if key is None:
+        return random.choice(available or all_partitions)
+    return all_partitions[zlib.crc32(key) % len(all_partitions)]
+
+
+# murmur2 совпадает с Java-клиентом и используется aiokafka по умолчанию.
+PARTITIONERS = {
+    "murmur2": DefaultPartitioner(),
+    "crc32": crc32_partitioner,
+}
 
 
 class KafkaProducer(KafkaProducerInterface):
@@ -17,24 +38,101 @@ class KafkaProducer(KafkaProducerInterface):
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, kafka_url: str):
+    def __init__(
+            self,
+            kafka_url: str,
+            logger: logging.Logger,
+            linger_ms: int,
+            max_batch_size: int,
+            compression_type: Optional[str],
+            acks: Union[int, Literal["all"]],
+            enable_idempotence: bool,
+            partitioner: str,
+    ):
         if not hasattr(self, 'producer'):
-            self.producer = AIOKafkaProducer(bootstrap_servers=kafka_url)
+            # linger_ms копит сообщения в пачки по партициям, пачка сжимается целиком.
+            self.producer = AIOKafkaProducer(
+                bootstrap_servers=kafka_url,
+                linger_ms=linger_ms,
+                max_batch_size=max_batch_size,
+                compression_type=compression_type,
+                acks=acks,
+                enable_idempotence=enable_idempotence,
+                partitioner=PARTITIONERS[partitioner],
+            )
+            self.logger = logger
             self.likes_topic = "likes"
             self.matches_topic = "matches"
+            self.sent = 0
+            self.delivered = 0
+            self.failed = 0
+            self.in_flight = 0
+            self.last_delivery_ms = 0.0
+            self.max_delivery_ms = 0.0
+            self.total_delivery_ms = 0.0
 
     async def start(self) -> None:
         await self.producer.start()
 
     async def stop(self) -> None:
         if self.producer:
+            # stop дожидается отправки всего, что лежит в буфере.
             await self.producer.stop()
             self.producer = None
 
-    async def sent_message(self, topic: str, data: dict) -> None:
-        message = json.dumps(data)
-        await self.producer.send(topic, message.encode("utf-8"))
+    async def sent_message(self, topic: str, data: dict, key: Optional[str] = None) -> None:
+        future = await self._send(topic, data, key)
+        await future
+
+    async def send_messages(self, messages: list[tuple[str, dict, Optional[str]]]) -> None:
+        """Отправляет пачку и ждёт подтверждения доставки каждого сообщения."""
+        futures = [await self._send(topic, data, key) for topic, data, key in messages]
+        await asyncio.gather(*futures)
+
+    def get_stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "last_delivery_ms": round(self.last_delivery_ms, 2),
+            "max_delivery_ms": round(self.max_delivery_ms, 2),
+            "avg_delivery_ms": round(self.total_delivery_ms / self.delivered, 2) if self.delivered else 0.0,
+        }
+
+    async def _send(self, topic: str, data: dict, key: Optional[str] = None) -> asyncio.Future:
+        started_at = time.monotonic()
+        future = await self.producer.send(
+            topic, json.dumps(data).encode("utf-8"), key=key.encode("utf-8") if key else None
+        )
+        self.sent += 1
+        self.in_flight += 1
+
+        def on_delivery(delivery: asyncio.Future) -> None:
+            self.in_flight -= 1
+            if delivery.cancelled() or delivery.exception():
+                self.failed += 1
+                error = "cancelled" if delivery.cancelled() else delivery.exception()
+                self.logger.error(f"Failed to deliver message to topic {topic}: {error}")
+                return
+            elapsed_ms = (time.monotonic() - started_at) * 1000
+            self.delivered += 1
+            self.last_delivery_ms = elapsed_ms
+            self.max_delivery_ms = max(self.max_delivery_ms, elapsed_ms)
+            self.total_delivery_ms += elapsed_ms
+
+        future.add_done_callback(on_delivery)
+        return future
 
 
 def get_kafka_producer() -> KafkaProducer:
-    return KafkaProducer(settings.kafka.KAFKA_URL)
+    return KafkaProducer(
+        kafka_url=settings.kafka.KAFKA_URL,
+        logger=get_logger(),
+        linger_ms=settings.kafka.KAFKA_PRODUCER_LINGER_MS,
+        max_batch_size=settings.kafka.KAFKA_PRODUCER_MAX_BATCH_SIZE,
+        compression_type=settings.kafka.KAFKA_PRODUCER_COMPRESSION_TYPE,
+        acks=settings.kafka.KAFKA_PRODUCER_ACKS,
+        enable_idempotence=settings.kafka.KAFKA_PRODUCER_IDEMPOTENCE,
+        partitioner=settings.kafka.KAFKA_PRODUCER_PARTITIONER,
+    )
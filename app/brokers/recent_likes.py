@@ -0,0 +1,60 @@
+import uuid
+from collections import OrderedDict
+
+from aiokafka import TopicPartition
+
+from app.utils import get_pair_key
+
+
+class RecentLikesCache:
+    """
+    Недавние лайки по партициям топика likes: для каждой пары — кто из двоих уже лайкнул и есть ли мэтч.
+    События пары приходят в одну партицию по порядку, поэтому кэшу партиции можно верить, пока она за нами:
+    после мэтча и на повторный лайк без встречного в БД идти незачем. На каждую партицию не больше
+    max_size пар, вытесняются давно не встречавшиеся.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.partitions: dict[TopicPartition, OrderedDict[str, tuple[frozenset[str], bool]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def is_resolved(self, partition: TopicPartition, user_id: uuid.UUID | str, liked_user_id: uuid.UUID | str) -> bool:
+        """Лайк уже ничего не изменит: пара в мэтче или это повтор лайка, встречного к которому не было."""
+        entry = self.partitions.get(partition, {}).get(get_pair_key(user_id, liked_user_id))
+        if entry:
+            likers, matched = entry
+            if matched or (str(user_id) in likers and str(liked_user_id) not in likers):
+                self.hits += 1
+                return True
+        self.misses += 1
+        return False
+
+    def remember(
+            self,
+            partition: TopicPartition,
+            user_id: uuid.UUID | str,
+            liked_user_id: uuid.UUID | str,
+            matched: bool,
+    ) -> None:
+        pairs = self.partitions.setdefault(partition, OrderedDict())
+        key = get_pair_key(user_id, liked_user_id)
+        likers, was_matched = pairs.pop(key, (frozenset(), False))
+        likers = likers | {str(user_id)}
+        # Оба лайка обработаны — мэтч в БД точно есть, создан он этим вызовом или раньше.
+        pairs[key] = (likers, matched or was_matched or len(likers) == 2)
+        if len(pairs) > self.max_size:
+            pairs.popitem(last=False)
+
+    def drop(self, partitions: set[TopicPartition]) -> None:
+        """Партиции ушли другому консьюмеру: их события мы больше не видим, кэш по ним неполный."""
+        for partition in partitions:
+            self.partitions.pop(partition, None)
+
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": sum(len(pairs) for pairs in self.partitions.values()),
+        }
@@ -0,0 +1,9 @@
+from app.configs.base import BaseConfig
+
+
+class CacheConfig(BaseConfig):
+    PROFILE_CACHE_TTL: int = 300
+    PROFILE_LOCAL_CACHE_TTL: int = 30
+    PROFILE_LOCAL_CACHE_MAX_ENTRIES: int = 10000
+    PROFILE_LOCAL_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    PROFILE_CACHE_INVALIDATION_CHANNEL: str = "profile_invalidations"
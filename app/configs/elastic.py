@@ -4,6 +4,16 @@ from app.configs.base import BaseConfig
 class ElasticConfig(BaseConfig):
     ELASTIC_HOST: str
     ELASTIC_PORT: int
+    ELASTIC_CONNECTIONS_PER_NODE: int = 25
+    ELASTIC_REQUEST_TIMEOUT: float = 5
+    ELASTIC_MAX_RETRIES: int = 3
+    ELASTIC_RETRY_ON_TIMEOUT: bool = True
+    ELASTIC_USERS_INDEX: str = "users"
+    ELASTIC_USERS_REFRESH_INTERVAL: str = "5s"
+    ELASTIC_USERS_SHARDS: int = 1
+    ELASTIC_USERS_REPLICAS: int = 1
+    ELASTIC_BULK_MAX_RETRIES: int = 3
+    ELASTIC_BULK_RETRY_BACKOFF_MS: int = 200
 
     @property
     def ELASTIC_URL(self) -> str:
@@ -0,0 +1,24 @@
+from app.configs.base import BaseConfig
+
+
+class FeedConfig(BaseConfig):
+    FEED_PREFETCH: bool = True
+    FEED_LOW_WATERMARK: int = 5
+    FEED_REFILL_LEASE_TTL: int = 30
+    FEED_REFILL_WAIT_MS: int = 500
+    FEED_REFILL_POLL_INTERVAL_MS: int = 50
+    FEED_QUEUE_MAX_LENGTH: int = 1000
+    FEED_SEEN_TTL: int = 60 * 60 * 24 * 30
+    FEED_SEEN_MAX_SIZE: int = 5000
+    FEED_BATCH_SIZE: int = 200
+    FEED_PIT_KEEP_ALIVE: int = 600
+    FEED_MAX_COUNT: int = 50
+    FEED_GEO_MODE: bool = False
+    FEED_GEO_RADIUS_KM: float = 50
+    FEED_RANKING_POOL_SIZE: int = 1000
+    FEED_RANKING_INTERESTS_WEIGHT: float = 1.0
+    FEED_RANKING_AGE_WEIGHT: float = 0.5
+    FEED_RANKING_RECENCY_WEIGHT: float = 0.3
+    FEED_RANKING_DISTANCE_WEIGHT: float = 0.5
+    FEED_RANKING_AGE_SCALE: float = 5.0
+    FEED_RANKING_RECENCY_HALF_LIFE: float = 60 * 60 * 24 * 7
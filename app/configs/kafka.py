@@ -1,9 +1,35 @@
+from typing import Literal, Optional, Union
+
+from pydantic import model_validator
+
 from app.configs.base import BaseConfig
 
 
 class KafkaConfig(BaseConfig):
     KAFKA_HOST: str
     KAFKA_PORT: int
+    KAFKA_CONSUMER_CONCURRENCY: int = 16
+    KAFKA_CONSUMER_QUEUE_SIZE: int = 100
+    KAFKA_CONSUMER_BATCH_MODE: bool = True
+    KAFKA_CONSUMER_MAX_RECORDS: int = 500
+    KAFKA_CONSUMER_BATCH_TIMEOUT_MS: int = 1000
+    KAFKA_PRODUCER_LINGER_MS: int = 5
+    KAFKA_PRODUCER_MAX_BATCH_SIZE: int = 65536
+    KAFKA_PRODUCER_COMPRESSION_TYPE: Optional[Literal["gzip", "snappy", "lz4", "zstd"]] = "gzip"
+    KAFKA_PRODUCER_ACKS: Union[int, Literal["all"]] = "all"
+    KAFKA_PRODUCER_IDEMPOTENCE: bool = True
+    KAFKA_PRODUCER_PARTITIONER: Literal["murmur2", "crc32"] = "murmur2"
+    KAFKA_CONSUMER_RECENT_LIKES_SIZE: int = 10000
+
+    @model_validator(mode="after")
+    def check_producer_acks(self) -> "KafkaConfig":
+        # aiokafka отказывается стартовать с идемпотентностью без acks=all, ошибка должна быть понятной сразу.
+        if self.KAFKA_PRODUCER_IDEMPOTENCE and self.KAFKA_PRODUCER_ACKS != "all":
+            raise ValueError(
+                f"KAFKA_PRODUCER_ACKS={self.KAFKA_PRODUCER_ACKS} requires KAFKA_PRODUCER_IDEMPOTENCE=false, "
+                f"idempotent producer needs acks=all"
+            )
+        return self
 
     @property
     def KAFKA_URL(self):
@@ -1,5 +1,8 @@
+from app.configs.cache import CacheConfig
 from app.configs.elastic import ElasticConfig
+from app.configs.feed import FeedConfig
 from app.configs.kafka import KafkaConfig
+from app.configs.outbox import OutboxConfig
 from app.configs.postgres import PostgresConfig
 from app.configs.redis import RedisConfig
 from app.configs.s3 import S3Config
@@ -14,6 +17,9 @@ class AppSettings:
         self.kafka = KafkaConfig()
         self.elastic = ElasticConfig()
         self.s3 = S3Config()
+        self.feed = FeedConfig()
+        self.cache = CacheConfig()
+        self.outbox = OutboxConfig()
 
 
 settings = AppSettings()
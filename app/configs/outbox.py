@@ -0,0 +1,8 @@
+from app.configs.base import BaseConfig
+
+
+class OutboxConfig(BaseConfig):
+    OUTBOX_RELAY_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_MS: int = 200
+    OUTBOX_STATS_INTERVAL_MS: int = 5000
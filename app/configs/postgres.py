@@ -1,3 +1,5 @@
+from typing import Optional
+
 from app.configs.base import BaseConfig
 
 
@@ -8,6 +10,19 @@ class PostgresConfig(BaseConfig):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     TEST_POSTGRES_DB: str
+    # Пул на воркер: при 4 воркерах в Postgres уходит до 4 * (POOL_SIZE + MAX_OVERFLOW) соединений.
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_TIMEOUT: float = 30
+    POSTGRES_POOL_RECYCLE: int = 1800
+    POSTGRES_POOL_PRE_PING: bool = True
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 100
+    POSTGRES_COMMAND_TIMEOUT: Optional[float] = None
+    # PgBouncer в режиме transaction: подготовленные выражения не переживают смену серверного соединения.
+    POSTGRES_PGBOUNCER: bool = False
+    # Реплики через запятую в виде host[:port]; пусто — все запросы идут в primary.
+    POSTGRES_REPLICA_HOSTS: str = ""
+    POSTGRES_READ_YOUR_WRITES_WINDOW: float = 5
 
     @property
     def DB_URL(self) -> str:
@@ -16,6 +31,16 @@ class PostgresConfig(BaseConfig):
         return (f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
                 f"{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}")
 
+    @property
+    def REPLICA_DB_URLS(self) -> list[str]:
+        urls = []
+        for host in filter(None, (host.strip() for host in self.POSTGRES_REPLICA_HOSTS.split(","))):
+            if ":" not in host:
+                host = f"{host}:{self.POSTGRES_PORT}"
+            urls.append(f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
+                        f"{host}/{self.POSTGRES_DB}")
+        return urls
+
     @property
     def TEST_DB_URL(self):
         if self.DOCKER:
@@ -1,13 +1,177 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import itertools
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.configs.main import settings
 
 DB_URL = settings.postgres.DB_URL
 
-engine = create_async_engine(DB_URL)
+
+class PoolMetrics:
+    """Счётчики пула соединений текущего воркера."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def observe_wait(self, wait_time: float) -> None:
+        self.checkouts += 1
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Событие checkout приходит уже после получения соединения, поэтому ожидание меряется вокруг _do_get."""
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.observe_wait(time.perf_counter() - started_at)
+
+
+def get_connect_args() -> dict:
+    connect_args = {
+        "statement_cache_size": settings.postgres.POSTGRES_STATEMENT_CACHE_SIZE,
+        "command_timeout": settings.postgres.POSTGRES_COMMAND_TIMEOUT,
+    }
+    if settings.postgres.POSTGRES_PGBOUNCER:
+        connect_args.update({
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            # Уникальные имена, чтобы не столкнуться с чужими выражениями на общем серверном соединении.
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        })
+    return connect_args
+
+
+def create_engine(url: str, poolclass: type = AsyncAdaptedQueuePool) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        poolclass=poolclass,
+        pool_size=settings.postgres.POSTGRES_POOL_SIZE,
+        max_overflow=settings.postgres.POSTGRES_MAX_OVERFLOW,
+        pool_timeout=settings.postgres.POSTGRES_POOL_TIMEOUT,
+        pool_recycle=settings.postgres.POSTGRES_POOL_RECYCLE,
+        pool_pre_ping=settings.postgres.POSTGRES_POOL_PRE_PING,
+        connect_args=get_connect_args(),
+    )
+
+
+engine = create_engine(DB_URL, poolclass=InstrumentedAsyncAdaptedQueuePool)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+replica_engines = [create_engine(url) for url in settings.postgres.REPLICA_DB_URLS]
+replica_session_makers = [
+    async_sessionmaker(replica_engine, expire_on_commit=False, class_=AsyncSession)
+    for replica_engine in replica_engines
+]
+
+
+class SessionRouter:
+    """
+    Чтения без требований к свежести уходят на реплики по кругу, записи — в primary.
+    Пользователь, только что изменивший свои данные, читает их из primary в течение окна read-your-writes.
+    """
+
+    def __init__(
+            self,
+            primary_session_maker: async_sessionmaker[AsyncSession],
+            replica_session_makers: list[async_sessionmaker[AsyncSession]],
+            read_your_writes_window: float,
+    ):
+        self.primary_session_maker = primary_session_maker
+        self.replica_session_makers = itertools.cycle(replica_session_makers) if replica_session_makers else None
+        self.read_your_writes_window = read_your_writes_window
+        # Окно одинаковое для всех, поэтому порядок вставки совпадает с порядком истечения.
+        self.pinned_users: OrderedDict[str, float] = OrderedDict()
+
+    def get_write_session_maker(self) -> async_sessionmaker[AsyncSession]:
+        return self.primary_session_maker
+
+    def get_read_session_maker(
+            self, user_id: Optional[Union[uuid.UUID, str]] = None
+    ) -> async_sessionmaker[AsyncSession]:
+        if self.replica_session_makers is None or (user_id and self.is_pinned(user_id)):
+            return self.primary_session_maker
+        return next(self.replica_session_makers)
+
+    def pin_user(self, user_id: Union[uuid.UUID, str]) -> None:
+        key = str(user_id)
+        self.pinned_users.pop(key, None)
+        self.pinned_users[key] = time.monotonic() + self.read_your_writes_window
+        self._prune()
+
+    def is_pinned(self, user_id: Union[uuid.UUID, str]) -> bool:
+        self._prune()
+        return str(user_id) in self.pinned_users
+
+    async def pin_users(self, user_ids: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Закрепляет пользователей, изменённых в других воркерах, и отдаёт id дальше по цепочке."""
+        async for user_id in user_ids:
+            self.pin_user(user_id)
+            yield user_id
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        while self.pinned_users:
+            user_id, pinned_until = next(iter(self.pinned_users.items()))
+            if pinned_until > now:
+                break
+            del self.pinned_users[user_id]
+
+
+session_router = SessionRouter(
+    async_session_maker, replica_session_makers, settings.postgres.POSTGRES_READ_YOUR_WRITES_WINDOW
+)
+
+
+@event.listens_for(engine.sync_engine.pool, "connect")
+def on_connect(*args) -> None:
+    pool_metrics.connects += 1
+
+
+@event.listens_for(engine.sync_engine.pool, "invalidate")
+def on_invalidate(*args) -> None:
+    pool_metrics.invalidations += 1
+
+
+def get_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool_metrics.checkouts,
+        "wait_time_avg_ms": round(
+            pool_metrics.wait_time_total / pool_metrics.checkouts * 1000, 2
+        ) if pool_metrics.checkouts else 0.0,
+        "wait_time_max_ms": round(pool_metrics.wait_time_max * 1000, 2),
+        "timeouts": pool_metrics.timeouts,
+        "connects": pool_metrics.connects,
+        "invalidations": pool_metrics.invalidations,
+    }
+
 
 class Base(DeclarativeBase):
     pass
@@ -15,3 +179,7 @@ class Base(DeclarativeBase):
 
 def get_async_session_maker() -> AsyncSession:
     return async_session_maker
+
+
+def get_session_router() -> SessionRouter:
+    return session_router
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from elasticsearch import AsyncElasticsearch
+
+from app.configs.main import settings
+
+_es_client: Optional[AsyncElasticsearch] = None
+
+
+def get_es_client() -> AsyncElasticsearch:
+    """Общий клиент воркера с пулом соединений; закрывается в lifespan."""
+    global _es_client
+    if _es_client is None:
+        _es_client = AsyncElasticsearch(
+            hosts=[settings.elastic.ELASTIC_URL],
+            connections_per_node=settings.elastic.ELASTIC_CONNECTIONS_PER_NODE,
+            request_timeout=settings.elastic.ELASTIC_REQUEST_TIMEOUT,
+            max_retries=settings.elastic.ELASTIC_MAX_RETRIES,
+            retry_on_timeout=settings.elastic.ELASTIC_RETRY_ON_TIMEOUT,
+        )
+    return _es_client
+
+
+async def close_es_client() -> None:
+    global _es_client
+    if _es_client is not None:
+        await _es_client.close()
+        _es_client = None
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from app.elastic import close_es_client
+from app.logger import get_logger
+from app.repositories.profiles_es_index import get_profiles_index_manager
+from app.services.elastic_sync import get_elastic_sync_service
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Управление индексом пользователей в Elasticsearch.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("init", help="обновить шаблон и создать первую версию индекса за алиасом")
+    subparsers.add_parser("status", help="показать индекс за алиасом")
+
+    reindex_parser = subparsers.add_parser(
+        "reindex", help="перелить документы в новую версию индекса и переключить алиас"
+    )
+    reindex_parser.add_argument("--delete-old", action="store_true", help="удалить прежний индекс после переключения")
+    reindex_parser.add_argument(
+        "--requests-per-second", type=float, default=None, help="ограничение скорости reindex, по умолчанию без него"
+    )
+
+    backfill_parser = subparsers.add_parser("backfill", help="переиндексировать всех пользователей из PG")
+    backfill_parser.add_argument("--chunk-size", type=int, default=2000, help="документов в одном _bulk")
+    backfill_parser.add_argument("--concurrency", type=int, default=8, help="_bulk-запросов в работе одновременно")
+    backfill_parser.add_argument(
+        "--checkpoint", default="es_backfill.checkpoint", help="файл чекпоинта для продолжения после падения"
+    )
+
+    verify_parser = subparsers.add_parser("verify", help="сверить индекс с PG")
+    verify_parser.add_argument("--chunk-size", type=int, default=2000, help="документов в одном mget")
+    verify_parser.add_argument("--concurrency", type=int, default=8, help="пачек в работе одновременно")
+    verify_parser.add_argument("--repair", action="store_true", help="исправить найденные расхождения")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    logger = get_logger()
+    index_manager = get_profiles_index_manager()
+    try:
+        if args.command == "init":
+            await index_manager.ensure_users_index()
+        elif args.command == "status":
+            current_index = await index_manager.get_current_index()
+            logger.info(f"Alias {index_manager.alias} -> {current_index}.")
+        elif args.command == "reindex":
+            new_index = await index_manager.reindex(
+                delete_old=args.delete_old,
+                requests_per_second=args.requests_per_second,
+            )
+            logger.info(f"Reindex finished, alias {index_manager.alias} -> {new_index}.")
+        elif args.command == "backfill":
+            await get_elastic_sync_service().backfill(
+                chunk_size=args.chunk_size,
+                concurrency=args.concurrency,
+                checkpoint_path=args.checkpoint,
+            )
+        elif args.command == "verify":
+            await get_elastic_sync_service().verify(
+                chunk_size=args.chunk_size,
+                concurrency=args.concurrency,
+                repair=args.repair,
+            )
+    finally:
+        await close_es_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
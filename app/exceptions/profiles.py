@@ -20,3 +20,16 @@ class LikeExistsException(CustomHTTPException):
 class MatchExistsException(CustomHTTPException):
     STATUS_CODE = status.HTTP_409_CONFLICT
     DETAIL = "Match already exists"
+
+
+class InvalidCursorException(CustomHTTPException):
+    STATUS_CODE = status.HTTP_400_BAD_REQUEST
+    DETAIL = "Invalid cursor"
+
+
+class FeedRefillingException(CustomHTTPException):
+    STATUS_CODE = status.HTTP_503_SERVICE_UNAVAILABLE
+    DETAIL = "Feed is being refilled, retry later"
+
+    def __init__(self) -> None:
+        super().__init__(headers={"Retry-After": "1"})
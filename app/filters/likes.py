@@ -0,0 +1,9 @@
+from typing import Optional
+
+from app.filters.base import BaseFilter
+
+
+class LikesFilter(BaseFilter):
+    """С cursor страница продолжается после последнего лайка предыдущей, offset не используется."""
+
+    cursor: Optional[str] = None
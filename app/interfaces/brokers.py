@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class KafkaProducerInterface(ABC):
@@ -6,5 +7,9 @@ class KafkaProducerInterface(ABC):
     matches_topic: str
 
     @abstractmethod
-    async def sent_message(self, topic: str, data: dict) -> None:
+    async def sent_message(self, topic: str, data: dict, key: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def send_messages(self, messages: list[tuple[str, dict, Optional[str]]]) -> None:
         raise NotImplementedError
@@ -1,30 +1,41 @@
 import uuid
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Optional, Union
+from typing import AsyncContextManager, AsyncGenerator, AsyncIterator, Optional, Union
 
 from aiobotocore.client import AioBaseClient
 from fastapi import UploadFile
 
-from app.filters.base import BaseFilter
+from app.configs.main import settings
+from app.filters.likes import LikesFilter
 from app.models.likes import LikeStatusEnum
-from app.schemas.likes import LikeCreateSchema, LikeSchema
+from app.schemas.feed import FeedCursorSchema, FeedPageSchema, QueuePopSchema
+from app.schemas.likes import LikeCreateSchema, LikeSchema, LikesPageSchema
 from app.schemas.matches import MatchCreateSchema, MatchSchema
-from app.schemas.users import (
-    TelegramUserInSchema,
-    UserDocumentSchema,
-    UserSchema,
-    UserUpdatePhotoSchema,
-    UserUpdateSchema,
-)
+from app.schemas.outbox import OutboxBacklogSchema, OutboxEventSchema
+from app.schemas.users import TelegramUserInSchema, UserSchema, UserUpdatePhotoSchema, UserUpdateSchema
 
 
 class ProfilesPostgresRepositoryInterface(ABC):
     @abstractmethod
-    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[UserSchema]:
+    async def get_user_by_id(self, user_id: uuid.UUID) -> Optional[UserSchema]:
         raise NotImplementedError
 
     @abstractmethod
-    async def get_user_by_id(self, user_id: uuid.UUID) -> Optional[UserSchema]:
+    async def get_users_by_ids(self, user_ids: list[uuid.UUID]) -> list[UserSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_feed_users_batch(self, after_user_id: Optional[uuid.UUID], limit: int) -> list[UserSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_users(
+            self, after_user_id: Optional[uuid.UUID], chunk_size: int
+    ) -> AsyncIterator[list[UserSchema]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_existing_user_ids(self, user_ids: list[uuid.UUID]) -> set[uuid.UUID]:
         raise NotImplementedError
 
     @abstractmethod
@@ -34,7 +45,7 @@ class ProfilesPostgresRepositoryInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def create_user_with_telegram_user_data(self, user_data: TelegramUserInSchema) -> UserSchema:
+    async def upsert_user_by_telegram_id(self, user_data: TelegramUserInSchema) -> tuple[UserSchema, bool]:
         raise NotImplementedError
 
     @abstractmethod
@@ -42,7 +53,7 @@ class ProfilesPostgresRepositoryInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_my_likes(self, user_id: uuid.UUID, filters: BaseFilter) -> list[LikeSchema]:
+    async def get_my_likes(self, user_id: uuid.UUID, filters: LikesFilter) -> LikesPageSchema:
         raise NotImplementedError
 
     @abstractmethod
@@ -57,14 +68,54 @@ class ProfilesPostgresRepositoryInterface(ABC):
     async def create_match(self, match_data: MatchCreateSchema) -> MatchSchema:
         raise NotImplementedError
 
+    @abstractmethod
+    async def resolve_mutual_like(self, user_id: uuid.UUID, liked_user_id: uuid.UUID) -> Optional[MatchSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def resolve_mutual_likes(self, pairs: list[tuple[uuid.UUID, uuid.UUID]]) -> list[MatchSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def lock_outbox_events(self, limit: int) -> AsyncContextManager[list[OutboxEventSchema]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_outbox_backlog(self) -> OutboxBacklogSchema:
+        raise NotImplementedError
+
 
 class ProfilesElasticRepositoryInterface(ABC):
     @abstractmethod
-    async def update_user_document(self, user: UserDocumentSchema) -> None:
+    async def get_users_queue(
+            self,
+            user: UserSchema,
+            exclude_ids: list[str],
+            cursor: Optional[FeedCursorSchema] = None,
+            size: int = settings.feed.FEED_RANKING_POOL_SIZE,
+    ) -> FeedPageSchema:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_users_queues(
+            self, users: list[UserSchema], exclude_ids: dict[str, list[str]]
+    ) -> dict[str, list[dict]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def index_users_documents(self, users: list[UserSchema]) -> dict[str, str]:
         raise NotImplementedError
 
     @abstractmethod
-    async def get_users_queue(self, user: UserSchema) -> list[str]:
+    async def get_outdated_users(self, users: list[UserSchema]) -> list[UserSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iterate_users_ids(self, chunk_size: int) -> AsyncIterator[list[str]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_users_documents(self, user_ids: list[str]) -> None:
         raise NotImplementedError
 
 
@@ -82,13 +133,141 @@ class ProfileQueuesRedisRepositoryInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def pop_from_queue(self, user_id: str) -> Optional[str]:
+    async def get_users_queues(self, user_ids: list[str]) -> dict[str, list[str]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def pop_from_queue_with_lease(
+            self, user_id: str, count: int, lease_token: str, low_watermark: int, acquire_lease: bool = True
+    ) -> QueuePopSchema:
         raise NotImplementedError
 
     @abstractmethod
     async def add_to_queue(self, user_id: str, target_user_ids: list[str]) -> None:
         raise NotImplementedError
 
+    @abstractmethod
+    async def add_to_queues(self, queues: dict[str, list[str]]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add_to_seen(self, user_id: str, target_user_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_seen_users(self, user_id: str) -> list[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_seen_users_many(self, user_ids: list[str]) -> dict[str, list[str]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_feed_cursor(self, user_id: str) -> Optional[FeedCursorSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_feed_cursor(self, user_id: str, cursor: Optional[FeedCursorSchema]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_feed_pool(self, user_id: str) -> list[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_feed_pool(self, user_id: str, candidates: list[dict]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_refill_lease(self, user_id: str, lease_token: str) -> None:
+        raise NotImplementedError
+
+
+class ProfilesCacheRedisRepositoryInterface(ABC):
+    @abstractmethod
+    async def connect(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_user(self, user_id: uuid.UUID) -> Optional[UserSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_users(self, user_ids: list[uuid.UUID]) -> dict[uuid.UUID, UserSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_user(self, user: UserSchema) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_users(self, users: list[UserSchema]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_user(self, user_id: uuid.UUID) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish_invalidation(self, user_id: uuid.UUID) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def listen_invalidations(self) -> AsyncGenerator[str, None]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_stats(self) -> dict:
+        raise NotImplementedError
+
+
+class ProfilesLocalCacheInterface(ABC):
+    @abstractmethod
+    def get_user(self, user_id: uuid.UUID) -> Optional[UserSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_users(self, user_ids: list[uuid.UUID]) -> dict[uuid.UUID, UserSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_user(self, user: UserSchema) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_users(self, users: list[UserSchema]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def consume_invalidations(self, user_ids: AsyncIterator[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_stats(self) -> dict:
+        raise NotImplementedError
+
+
+class ProfilesIndexManagerInterface(ABC):
+    @abstractmethod
+    async def ensure_users_index(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_current_index(self) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def reindex(self, delete_old: bool = False, requests_per_second: Optional[float] = None) -> str:
+        raise NotImplementedError
+
 
 class ProfilesS3RepositoryInterface(ABC):
     @abstractmethod
@@ -4,10 +4,11 @@ from typing import Optional, Union
 
 from fastapi import UploadFile
 
-from app.filters.base import BaseFilter
+from app.filters.likes import LikesFilter
 from app.models.likes import LikeStatusEnum
-from app.schemas.likes import LikeCreateSchema, LikeSchema
-from app.schemas.matches import MatchCreateSchema
+from app.schemas.feed import FeedCursorSchema, FeedPageSchema
+from app.schemas.likes import LikeCreateSchema, LikeSchema, LikesPageSchema, SkipCreateSchema
+from app.schemas.matches import MatchCreateSchema, MatchSchema
 from app.schemas.users import TelegramUserInSchema, UserSchema, UserUpdatePhotoSchema, UserUpdateSchema
 
 
@@ -17,11 +18,11 @@ class ProfilesServiceInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[UserSchema]:
+    async def get_user_by_id(self, user_id: uuid.UUID) -> Optional[UserSchema]:
         raise NotImplementedError
 
     @abstractmethod
-    async def get_user_by_id(self, user_id: uuid.UUID) -> Optional[UserSchema]:
+    async def get_users_by_ids(self, user_ids: list[uuid.UUID]) -> list[UserSchema]:
         raise NotImplementedError
 
     @abstractmethod
@@ -35,7 +36,7 @@ class ProfilesServiceInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def create_user_with_telegram_user_data(self, user_data: TelegramUserInSchema) -> UserSchema:
+    async def login_telegram_user(self, user_data: TelegramUserInSchema) -> UserSchema:
         raise NotImplementedError
 
     @abstractmethod
@@ -43,7 +44,11 @@ class ProfilesServiceInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_my_likes(self, user_id: uuid.UUID, filters: BaseFilter) -> list[LikeSchema]:
+    async def skip_user(self, user_id: uuid.UUID, skip_data: SkipCreateSchema) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_my_likes(self, user_id: uuid.UUID, filters: LikesFilter) -> LikesPageSchema:
         raise NotImplementedError
 
     @abstractmethod
@@ -59,11 +64,19 @@ class ProfilesServiceInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def update_user_document(self, user: UserSchema) -> None:
+    async def resolve_mutual_like(self, user_id: uuid.UUID, liked_user_id: uuid.UUID) -> Optional[MatchSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def resolve_mutual_likes(self, pairs: list[tuple[uuid.UUID, uuid.UUID]]) -> list[MatchSchema]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_user_for_action(self, user_id: uuid.UUID) -> Optional[uuid.UUID]:
         raise NotImplementedError
 
     @abstractmethod
-    async def get_user_for_action(self, user_id: uuid.UUID) -> Optional[UserSchema]:
+    async def get_users_for_action(self, user_id: uuid.UUID, count: int) -> list[uuid.UUID]:
         raise NotImplementedError
 
     @abstractmethod
@@ -71,7 +84,13 @@ class ProfilesServiceInterface(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def _get_users_queue(self, user: UserSchema) -> list[str]:
+    async def refill_users_queue(self, user_id: uuid.UUID, lease_token: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _get_users_queue(
+            self, user: UserSchema, exclude_ids: list[str], cursor: Optional[FeedCursorSchema], size: int
+    ) -> FeedPageSchema:
         raise NotImplementedError
 
     @abstractmethod
@@ -11,11 +11,19 @@ sys.path.insert(1, os.path.join(sys.path[0], '..'))
 
 
 from app.api.auth import router as auth_router
+from app.api.metrics import router as metrics_router
 from app.api.profile import router as profile_router
 from app.brokers.consumer import get_kafka_consumer
 from app.brokers.producer import get_kafka_producer
+from app.configs.main import settings
+from app.database import get_session_router
+from app.elastic import close_es_client, get_es_client
 from app.logger import get_logger
+from app.repositories.profiles_cache import get_profiles_cache_redis_repository
+from app.repositories.profiles_es_index import get_profiles_index_manager
+from app.repositories.profiles_local_cache import get_profiles_local_cache
 from app.repositories.profiles_redis import get_profile_queues_redis_repository
+from app.services.outbox_relay import get_outbox_relay_service
 
 
 @asynccontextmanager
@@ -35,8 +43,37 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await redis_repository.connect()
     logger.info("Redis connection established.")
 
+    cache_repository = get_profiles_cache_redis_repository()
+    await cache_repository.connect()
+    logger.info("Redis profile cache connection established.")
+
+    local_cache = get_profiles_local_cache()
+    session_router = get_session_router()
+    _ = asyncio.create_task(
+        local_cache.consume_invalidations(session_router.pin_users(cache_repository.listen_invalidations()))
+    )
+    logger.info("Profile cache invalidation listener started.")
+
+    get_es_client()
+    index_manager = get_profiles_index_manager()
+    await index_manager.ensure_users_index()
+    logger.info("Elasticsearch client initialized, users index is ready.")
+
+    outbox_relay_task = None
+    if settings.outbox.OUTBOX_RELAY_ENABLED:
+        outbox_relay_task = asyncio.create_task(get_outbox_relay_service().run())
+        logger.info("Outbox relay started.")
+
     yield
 
+    if outbox_relay_task:
+        outbox_relay_task.cancel()
+        try:
+            await outbox_relay_task
+        except asyncio.CancelledError:
+            pass
+        logger.info("Outbox relay stopped.")
+
     await kafka_producer.stop()
     logger.info("Kafka Producer stopped.")
 
@@ -46,6 +83,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await redis_repository.close()
     logger.info("Redis connection closed.")
 
+    await cache_repository.close()
+    logger.info("Redis profile cache connection closed.")
+
+    await close_es_client()
+    logger.info("Elasticsearch client closed.")
+
 
 app = FastAPI(
     title="WALK Profile",
@@ -54,6 +97,7 @@ app = FastAPI(
 
 app.include_router(auth_router)
 app.include_router(profile_router)
+app.include_router(metrics_router)
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ from app.configs.main import settings
 from app.database import Base
 from app.models.likes import Likes
 from app.models.matches import Matches
+from app.models.outbox import Outbox
 from app.models.users import Users
 
 config = context.config
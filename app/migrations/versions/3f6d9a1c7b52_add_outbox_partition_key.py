@@ -0,0 +1,25 @@
+"""add outbox partition_key
+
+Revision ID: 3f6d9a1c7b52
+Revises: e4a8b2c6d0f1
+Create Date: 2026-10-18 19:12:37.481205
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6d9a1c7b52'
+down_revision: Union[str, None] = 'e4a8b2c6d0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('outbox', sa.Column('partition_key', sa.String(length=73), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('outbox', 'partition_key')
@@ -0,0 +1,30 @@
+"""add users updated_at
+
+Revision ID: 7d2e5f8a1c36
+Revises: 3f6d9a1c7b52
+Create Date: 2026-10-18 21:04:12.538190
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e5f8a1c36'
+down_revision: Union[str, None] = '3f6d9a1c7b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column(
+        'updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('NOW()'), nullable=True
+    ))
+    # Существующие профили не менялись с момента создания, иначе все анкеты станут одинаково свежими.
+    op.execute("UPDATE users SET updated_at = created_at")
+    op.alter_column('users', 'updated_at', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'updated_at')
@@ -0,0 +1,35 @@
+"""add likes inbox index
+
+Revision ID: 9c3f1d7e8a24
+Revises: 5b7e2c4a91d3
+Create Date: 2026-10-18 16:24:09.731542
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3f1d7e8a24'
+down_revision: Union[str, None] = '5b7e2c4a91d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Индекс строится без блокировки записи в likes, CONCURRENTLY не работает внутри транзакции.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_likes_inbox',
+            'likes',
+            ['liked_user_id', sa.text('created_at DESC'), sa.text('like_id DESC')],
+            unique=False,
+            postgresql_where=sa.text("status != 'match'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_likes_inbox', table_name='likes', postgresql_concurrently=True)
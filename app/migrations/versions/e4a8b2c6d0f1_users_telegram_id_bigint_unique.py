@@ -0,0 +1,32 @@
+"""users telegram_id bigint unique
+
+Revision ID: e4a8b2c6d0f1
+Revises: 9c3f1d7e8a24
+Create Date: 2026-10-18 17:41:52.208637
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a8b2c6d0f1'
+down_revision: Union[str, None] = '9c3f1d7e8a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('users', 'telegram_id', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=False)
+    # Упадёт, если в users уже есть дубли telegram_id: их нужно слить вручную до миграции.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_users_telegram_id'), 'users', ['telegram_id'], unique=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_users_telegram_id'), table_name='users', postgresql_concurrently=True)
+    op.alter_column('users', 'telegram_id', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=False)
@@ -2,7 +2,7 @@ import datetime
 import enum
 import uuid
 
-from sqlalchemy import TIMESTAMP, Enum, ForeignKey, UniqueConstraint, text
+from sqlalchemy import TIMESTAMP, Enum, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -24,3 +24,13 @@ class Likes(Base):
     created_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"))
 
     __table_args__ = (UniqueConstraint('user_id', 'liked_user_id', name='_user_liked_user_uc'),)
+
+
+# Входящие лайки читаются keyset-страницами по (created_at, like_id), мэтчи в выдачу не попадают.
+Index(
+    "ix_likes_inbox",
+    Likes.liked_user_id,
+    Likes.created_at.desc(),
+    Likes.like_id.desc(),
+    postgresql_where=Likes.status != LikeStatusEnum.match,
+)
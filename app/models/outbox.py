@@ -0,0 +1,25 @@
+import datetime
+import enum
+from typing import Optional
+
+from sqlalchemy import JSON, TIMESTAMP, BigInteger, Enum, Identity, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class OutboxEventTypeEnum(enum.Enum):
+    like_created = "like_created"
+    match_created = "match_created"
+    user_updated = "user_updated"
+
+
+class Outbox(Base):
+    __tablename__ = "outbox"
+
+    outbox_id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    event_type: Mapped[OutboxEventTypeEnum] = mapped_column(Enum(OutboxEventTypeEnum))
+    payload: Mapped[dict] = mapped_column(JSON)
+    # Ключ сообщения в Kafka: события одной пары пользователей попадают в одну партицию.
+    partition_key: Mapped[Optional[str]] = mapped_column(String(73), nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"))
@@ -2,7 +2,7 @@ import datetime
 import enum
 import uuid
 
-from sqlalchemy import JSON, TIMESTAMP, Enum, text
+from sqlalchemy import JSON, TIMESTAMP, BigInteger, Enum, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -32,7 +32,7 @@ class Users(Base):
     __tablename__ = "users"
 
     user_id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
-    telegram_id: Mapped[int]
+    telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)
     name: Mapped[str]
     age: Mapped[int] = mapped_column(nullable=True)
     sex: Mapped[UserSexEnum] = mapped_column(Enum(UserSexEnum), nullable=True)
@@ -41,4 +41,10 @@ class Users(Base):
     interests: Mapped[list] = mapped_column(JSON, nullable=True)
     city: Mapped[str] = mapped_column(nullable=True)
     zodiac: Mapped[ZodiacEnum] = mapped_column(Enum(ZodiacEnum), nullable=True)
+    latitude: Mapped[float] = mapped_column(nullable=True)
+    longitude: Mapped[float] = mapped_column(nullable=True)
     created_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP, server_default=text("NOW()"))
+    # Время последнего изменения профиля: по нему ранжируется свежесть анкеты в ленте.
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=text("NOW()"), onupdate=text("NOW()")
+    )
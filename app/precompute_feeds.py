@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+from app.configs.main import settings
+from app.elastic import close_es_client
+from app.logger import get_logger
+from app.repositories.profiles_redis import get_profile_queues_redis_repository
+from app.services.feed_precompute import get_feed_precompute_service
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Прогрев очередей анкет до пиковых часов.")
+    parser.add_argument("--batch-size", type=int, default=200, help="пользователей в пачке и запросов в одном _msearch")
+    parser.add_argument("--concurrency", type=int, default=4, help="пачек в работе одновременно")
+    parser.add_argument("--rate", type=float, default=0, help="пачек в секунду, 0 — без ограничения")
+    parser.add_argument(
+        "--min-queue-length",
+        type=int,
+        default=settings.feed.FEED_BATCH_SIZE,
+        help="очереди не короче этого значения считаются прогретыми и пропускаются",
+    )
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    logger = get_logger()
+    redis_repository = get_profile_queues_redis_repository()
+    await redis_repository.connect()
+    try:
+        feed_precompute_service = get_feed_precompute_service()
+        warmed_queues = await feed_precompute_service.run(
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            min_queue_length=args.min_queue_length,
+        )
+        logger.info(f"Feed precompute finished, {warmed_queues} queues warmed.")
+    finally:
+        await redis_repository.close()
+        await close_es_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+from typing import AsyncGenerator, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.configs.main import settings
+from app.interfaces.repositories import ProfilesCacheRedisRepositoryInterface
+from app.schemas.users import UserSchema
+
+
+class ProfilesCacheRedisRepository(ProfilesCacheRedisRepositoryInterface):
+    """Read-through кэш UserSchema в Redis. Ошибки Redis считаются промахом, чтобы не ронять чтение."""
+
+    _instance: Optional["ProfilesCacheRedisRepository"] = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "redis"):
+            self.redis = redis.from_url(
+                settings.redis.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+            self.hits = 0
+            self.misses = 0
+            self.errors = 0
+
+    async def connect(self) -> None:
+        await self.redis.ping()
+
+    async def close(self) -> None:
+        if self.redis:
+            await self.redis.close()
+
+    async def get_user(self, user_id: uuid.UUID) -> Optional[UserSchema]:
+        users = await self.get_users([user_id])
+        return users.get(user_id)
+
+    async def get_users(self, user_ids: list[uuid.UUID]) -> dict[uuid.UUID, UserSchema]:
+        if not user_ids:
+            return {}
+        try:
+            cached_users = await self.redis.mget([self._user_key(user_id) for user_id in user_ids])
+        except RedisError:
+            self.errors += 1
+            self.misses += len(user_ids)
+            return {}
+        users = {
+            user_id: UserSchema.model_validate_json(cached_user)
+            for user_id, cached_user in zip(user_ids, cached_users) if cached_user
+        }
+        self.hits += len(users)
+        self.misses += len(user_ids) - len(users)
+        return users
+
+    async def set_user(self, user: UserSchema) -> None:
+        await self.set_users([user])
+
+    async def set_users(self, users: list[UserSchema]) -> None:
+        if not users:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for user in users:
+                    pipe.set(self._user_key(user.user_id), user.model_dump_json(), ex=settings.cache.PROFILE_CACHE_TTL)
+                await pipe.execute()
+        except RedisError:
+            self.errors += 1
+
+    async def delete_user(self, user_id: uuid.UUID) -> None:
+        await self.redis.delete(self._user_key(user_id))
+
+    async def publish_invalidation(self, user_id: uuid.UUID) -> None:
+        await self.redis.publish(settings.cache.PROFILE_CACHE_INVALIDATION_CHANNEL, str(user_id))
+
+    async def listen_invalidations(self) -> AsyncGenerator[str, None]:
+        """id пользователей из канала инвалидации; после обрыва соединения подписка восстанавливается."""
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(settings.cache.PROFILE_CACHE_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    yield message["data"]
+            except RedisError:
+                self.errors += 1
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def get_stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+        }
+
+    @staticmethod
+    def _user_key(user_id: uuid.UUID) -> str:
+        return f"profile:{user_id}"
+
+
+def get_profiles_cache_redis_repository() -> ProfilesCacheRedisRepository:
+    return ProfilesCacheRedisRepository()
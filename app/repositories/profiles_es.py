@@ -1,61 +1,282 @@
-from elastic_transport import ObjectApiResponse
-from elasticsearch import AsyncElasticsearch, BadRequestError
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, Optional
+
+from elastic_transport import ObjectApiResponse, TransportError
+from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
+from elasticsearch.helpers import async_bulk
 
 from app.configs.main import settings
+from app.elastic import get_es_client
 from app.exceptions.profiles import ProfileNotCompletedException
 from app.interfaces.repositories import ProfilesElasticRepositoryInterface
-from app.schemas.users import UserDocumentSchema, UserSchema
+from app.schemas.feed import FeedCursorSchema, FeedPageSchema
+from app.schemas.users import GeoPointSchema, UserDocumentSchema, UserSchema
+
+RETRYABLE_STATUSES = {429, 502, 503, 504}
 
 
 class ProfilesElasticRepository(ProfilesElasticRepositoryInterface):
     def __init__(
             self,
             es_client: AsyncElasticsearch,
-            users_index: str = "users",
+            users_index: str = settings.elastic.ELASTIC_USERS_INDEX,
+            max_retries: int = settings.elastic.ELASTIC_BULK_MAX_RETRIES,
+            retry_backoff_ms: int = settings.elastic.ELASTIC_BULK_RETRY_BACKOFF_MS,
     ):
         self.es_client = es_client
         self.users_index = users_index
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+
+    async def get_users_queue(
+            self,
+            user: UserSchema,
+            exclude_ids: list[str],
+            cursor: Optional[FeedCursorSchema] = None,
+            size: int = settings.feed.FEED_RANKING_POOL_SIZE,
+    ) -> FeedPageSchema:
+        """
+        Следующие size кандидатов для ранжирования: search_after поверх point-in-time,
+        курсор хранится у вызывающего.
+        """
+        query = self._get_feed_query(user)
+        sort = self._get_feed_sort(user)
+        query_hash = self._get_query_hash({"query": query, "sort": sort})
+        query["bool"]["must_not"] = [{"ids": {"values": [str(user.user_id), *exclude_ids]}}]
+        keep_alive = f"{settings.feed.FEED_PIT_KEEP_ALIVE}s"
+        try:
+            if cursor and cursor.query_hash != query_hash:
+                await self._close_point_in_time(cursor.pit_id)
+                cursor = None
+            if cursor is None:
+                cursor = await self._open_point_in_time(query_hash)
+            try:
+                result = await self._search_page(query, sort, cursor, keep_alive, size)
+            except NotFoundError:
+                cursor = await self._open_point_in_time(query_hash)
+                result = await self._search_page(query, sort, cursor, keep_alive, size)
+            hits = result.body["hits"]["hits"]
+            if len(hits) < size:
+                await self._close_point_in_time(result.body["pit_id"])
+                next_cursor = None
+            else:
+                next_cursor = FeedCursorSchema(
+                    pit_id=result.body["pit_id"],
+                    query_hash=query_hash,
+                    search_after=hits[-1]["sort"],
+                )
+        except BadRequestError:
+            raise ProfileNotCompletedException
+        return FeedPageSchema(candidates=self._get_candidates(user, hits), cursor=next_cursor)
+
+    async def get_users_queues(
+            self, users: list[UserSchema], exclude_ids: dict[str, list[str]]
+    ) -> dict[str, list[dict]]:
+        """Пулы кандидатов для пачки пользователей одним _msearch; пользователи с ошибкой запроса пропускаются."""
+        searches = []
+        for user in users:
+            query = self._get_feed_query(user)
+            user_exclude_ids = exclude_ids.get(str(user.user_id), [])
+            query["bool"]["must_not"] = [{"ids": {"values": [str(user.user_id), *user_exclude_ids]}}]
+            searches.append({"index": self.users_index})
+            searches.append({
+                "query": query,
+                "sort": self._get_feed_sort(user),
+                "size": settings.feed.FEED_RANKING_POOL_SIZE,
+                "_source": ["user_id", "interests", "age", "updated_at"],
+                "track_total_hits": False,
+            })
+        result = await self.es_client.msearch(searches=searches)
+        candidates = {}
+        for user, response in zip(users, result.body["responses"]):
+            if "error" in response:
+                continue
+            candidates[str(user.user_id)] = self._get_candidates(user, response["hits"]["hits"])
+        return candidates
 
-    async def update_user_document(self, user: UserSchema) -> None:
-        user_document = UserDocumentSchema(**user.dict())
-        async with self.es_client as client:
-            await client.update(
-                index=self.users_index,
-                id=user.user_id,
-                doc=user_document.dict(exclude_unset=True),
-                doc_as_upsert=True,
+    async def index_users_documents(self, users: list[UserSchema]) -> dict[str, str]:
+        """
+        Полная перезапись документов одним _bulk. Версия документа — updated_at профиля, поэтому запоздавшая
+        запись не перетирает более свежую (409 значит, что в индексе уже новее). 429, 5xx и закрытая на время
+        reindex запись повторяются с backoff'ом, если они не прошли и после повторов — RuntimeError.
+        Документы, отклонённые насовсем (4xx), возвращаются: id -> ошибка.
+        """
+        actions = {str(user.user_id): self._get_index_action(user) for user in users}
+        rejected = {}
+        for attempt in range(self.max_retries + 1):
+            try:
+                _, errors = await async_bulk(
+                    self.es_client,
+                    list(actions.values()),
+                    chunk_size=len(actions),
+                    max_retries=0,
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                )
+            except TransportError as e:
+                # Соединение не установилось, пачка повторяется целиком.
+                errors = [{"index": {"_id": user_id, "status": 503, "error": str(e)}} for user_id in actions]
+            retry_actions = {}
+            for error in errors:
+                user_id = error["index"]["_id"]
+                if error["index"].get("status") == 409:
+                    continue
+                if error["index"].get("status") in RETRYABLE_STATUSES or self._is_write_blocked(error["index"]):
+                    retry_actions[user_id] = actions[user_id]
+                else:
+                    rejected[user_id] = str(error["index"].get("error"))
+            if not retry_actions:
+                return rejected
+            if attempt < self.max_retries:
+                actions = retry_actions
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        raise RuntimeError(f"{len(retry_actions)} documents failed to index after {self.max_retries} retries: "
+                           f"{list(retry_actions)[:3]}")
+
+    async def get_outdated_users(self, users: list[UserSchema]) -> list[UserSchema]:
+        """Пользователи, чьих документов нет в индексе или они расходятся с PG по содержимому."""
+        result = await self.es_client.mget(index=self.users_index, ids=[str(user.user_id) for user in users])
+        documents_hashes = {
+            document["_id"]: self._get_document_hash(document["_source"])
+            for document in result.body["docs"] if document.get("found")
+        }
+        return [
+            user for user in users
+            if documents_hashes.get(str(user.user_id)) != self._get_document_hash(
+                self._get_user_document(user).dict(exclude_unset=True)
             )
+        ]
 
-    async def get_users_queue(self, user: UserSchema) -> list[str]:
-        query = {"query": {"bool": {
-            "filter": [
-                {"term": {"city.keyword": user.city}},
-                {"bool": {"must_not": {"term": {"user_id.keyword": user.user_id}}}},
-            ],
+    async def iterate_users_ids(self, chunk_size: int) -> AsyncIterator[list[str]]:
+        """Все id документов индекса пачками по chunk_size, без _source."""
+        cursor = await self._open_point_in_time("")
+        try:
+            while True:
+                result = await self.es_client.search(
+                    size=chunk_size,
+                    pit={"id": cursor.pit_id, "keep_alive": f"{settings.feed.FEED_PIT_KEEP_ALIVE}s"},
+                    sort=[{"_shard_doc": "asc"}],
+                    search_after=cursor.search_after,
+                    source=False,
+                    track_total_hits=False,
+                )
+                hits = result.body["hits"]["hits"]
+                if not hits:
+                    break
+                cursor = FeedCursorSchema(pit_id=result.body["pit_id"], query_hash="", search_after=hits[-1]["sort"])
+                yield [hit["_id"] for hit in hits]
+        finally:
+            await self._close_point_in_time(cursor.pit_id)
+
+    async def delete_users_documents(self, user_ids: list[str]) -> None:
+        actions = [{"_op_type": "delete", "_index": self.users_index, "_id": user_id} for user_id in user_ids]
+        await async_bulk(self.es_client, actions, chunk_size=len(actions), raise_on_error=False)
+
+    async def _open_point_in_time(self, query_hash: str) -> FeedCursorSchema:
+        pit = await self.es_client.open_point_in_time(
+            index=self.users_index,
+            keep_alive=f"{settings.feed.FEED_PIT_KEEP_ALIVE}s",
+        )
+        return FeedCursorSchema(pit_id=pit.body["id"], query_hash=query_hash)
+
+    async def _close_point_in_time(self, pit_id: str) -> None:
+        try:
+            await self.es_client.close_point_in_time(id=pit_id)
+        except NotFoundError:
+            pass
+
+    async def _search_page(
+            self, query: dict, sort: list[dict], cursor: FeedCursorSchema, keep_alive: str, size: int
+    ) -> ObjectApiResponse:
+        return await self.es_client.search(
+            query=query,
+            size=size,
+            pit={"id": cursor.pit_id, "keep_alive": keep_alive},
+            sort=sort,
+            search_after=cursor.search_after,
+            source=["user_id", "interests", "age", "updated_at"],
+            track_total_hits=False,
+        )
+
+    def _get_candidates(self, user: UserSchema, hits: list[dict]) -> list[dict]:
+        candidates = [data["_source"] for data in hits]
+        if self._is_geo_query(user):
+            for candidate, data in zip(candidates, hits):
+                candidate["distance"] = data["sort"][0]
+        return candidates
+
+    def _get_index_action(self, user: UserSchema) -> dict:
+        action = {
+            "_op_type": "index",
+            "_index": self.users_index,
+            "_id": str(user.user_id),
+            "_source": self._get_user_document(user).dict(exclude_unset=True),
+        }
+        if user.updated_at:
+            # external_gte: повтор той же версии (ретрай, backfill) проходит, более старая отклоняется.
+            action["version"] = int(user.updated_at.timestamp() * 1000)
+            action["version_type"] = "external_gte"
+        return action
+
+    @staticmethod
+    def _is_write_blocked(error: dict) -> bool:
+        return isinstance(error.get("error"), dict) and error["error"].get("type") == "cluster_block_exception"
+
+    @staticmethod
+    def _get_user_document(user: UserSchema) -> UserDocumentSchema:
+        location = None
+        if user.latitude is not None and user.longitude is not None:
+            location = GeoPointSchema(lat=user.latitude, lon=user.longitude)
+        updated_at = int(user.updated_at.timestamp()) if user.updated_at else None
+        return UserDocumentSchema(
+            **user.dict(exclude={"updated_at"}), location=location, updated_at=updated_at
+        )
+
+    @staticmethod
+    def _is_geo_query(user: UserSchema) -> bool:
+        return settings.feed.FEED_GEO_MODE and user.latitude is not None and user.longitude is not None
+
+    def _get_feed_query(self, user: UserSchema) -> dict:
+        if self._is_geo_query(user):
+            area_filter = {"geo_distance": {
+                "distance": f"{settings.feed.FEED_GEO_RADIUS_KM}km",
+                "location": {"lat": user.latitude, "lon": user.longitude},
+            }}
+        else:
+            area_filter = {"term": {"city": user.city}}
+        return {"bool": {
+            "filter": [area_filter],
             "should": [
                 {"terms": {"interests": user.interests}},
             ],
             "minimum_should_match": 0,
-        }}}
-        try:
-            async with self.es_client as client:
-                result = await client.search(
-                    body=query,
-                    index=self.users_index,
-                )
-        except BadRequestError:
-            raise ProfileNotCompletedException
-        users = self._get_hits(result)
-        user_ids = [user["user_id"] for user in users]
-        return user_ids
+        }}
+
+    def _get_feed_sort(self, user: UserSchema) -> list[dict]:
+        """В geo-режиме пул — ближайшие кандидаты, расстояние (км) попадает в sort[0]."""
+        if self._is_geo_query(user):
+            return [
+                {"_geo_distance": {
+                    "location": {"lat": user.latitude, "lon": user.longitude},
+                    "order": "asc",
+                    "unit": "km",
+                }},
+                {"_shard_doc": "asc"},
+            ]
+        return [{"_score": "desc"}, {"_shard_doc": "asc"}]
+
+    @staticmethod
+    def _get_document_hash(document: dict) -> str:
+        return hashlib.sha1(json.dumps(document, sort_keys=True).encode()).hexdigest()
 
     @staticmethod
-    def _get_hits(result: ObjectApiResponse) -> list[dict]:
-        hits = result.body["hits"]["hits"]
-        result = [data["_source"] for data in hits]
-        return result
+    def _get_query_hash(query: dict) -> str:
+        """Курсор валиден, пока не поменялись параметры запроса (город или координаты, интересы)."""
+        return hashlib.sha1(json.dumps(query, sort_keys=True, default=str).encode()).hexdigest()
 
 
 def get_profiles_es_repository() -> ProfilesElasticRepository:
-    es_client = AsyncElasticsearch(hosts=[settings.elastic.ELASTIC_URL])
+    es_client = get_es_client()
     return ProfilesElasticRepository(es_client)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Optional
+
+from elasticsearch import AsyncElasticsearch, BadRequestError
+from elasticsearch.helpers import async_bulk, async_scan
+
+from app.configs.main import settings
+from app.elastic import get_es_client
+from app.interfaces.repositories import ProfilesIndexManagerInterface
+from app.logger import get_logger
+
+# Фильтры идут только по keyword без анализа; doc_values оставлены полям, по которым есть сортировка.
+# user_id живёт в _id и в _source для ранжирования, отдельно не индексируется.
+USERS_INDEX_MAPPINGS = {
+    "dynamic": False,
+    "properties": {
+        "user_id": {"type": "keyword", "index": False, "doc_values": False},
+        "sex": {"type": "keyword", "doc_values": False},
+        "age": {"type": "short"},
+        "interests": {"type": "keyword", "doc_values": False},
+        "city": {"type": "keyword", "doc_values": False},
+        "location": {"type": "geo_point"},
+        "updated_at": {"type": "date", "format": "epoch_second"},
+    },
+}
+
+REINDEX_POLL_INTERVAL = 5
+REINDEX_CHUNK_SIZE = 1000
+
+
+class ProfilesIndexManager(ProfilesIndexManagerInterface):
+    """
+    Индекс пользователей версионируется (users_v1, users_v2, ...), приложение ходит через алиас.
+    Настройки и маппинг задаются шаблоном, поэтому любая новая версия создаётся уже правильной.
+    Документы пишутся с внешней версией из updated_at, reindex переносит её вместе с документом.
+    """
+
+    def __init__(
+            self,
+            es_client: AsyncElasticsearch,
+            logger: logging.Logger,
+            alias: str,
+            refresh_interval: str,
+            number_of_shards: int,
+            number_of_replicas: int,
+    ):
+        self.es_client = es_client
+        self.logger = logger
+        self.alias = alias
+        self.refresh_interval = refresh_interval
+        self.number_of_shards = number_of_shards
+        self.number_of_replicas = number_of_replicas
+
+    async def ensure_users_index(self) -> None:
+        await self.put_index_template()
+        if await self.es_client.indices.exists_alias(name=self.alias):
+            return
+        if await self.es_client.indices.exists(index=self.alias):
+            self.logger.warning(
+                f"Index {self.alias} was created without managed mappings, run `python app/es_index.py reindex`."
+            )
+            return
+        index = self._get_index_name(1)
+        try:
+            await self.es_client.indices.create(index=index, aliases={self.alias: {"is_write_index": True}})
+        except BadRequestError as e:
+            # Индекс создают одновременно все воркеры, успевает один из них.
+            if e.error != "resource_already_exists_exception":
+                raise
+            return
+        self.logger.info(f"Elasticsearch index {index} created behind alias {self.alias}.")
+
+    async def put_index_template(self) -> None:
+        await self.es_client.indices.put_index_template(
+            name=self.alias,
+            index_patterns=[f"{self.alias}_v*"],
+            template={
+                "settings": {
+                    "number_of_shards": self.number_of_shards,
+                    "number_of_replicas": self.number_of_replicas,
+                    "refresh_interval": self.refresh_interval,
+                },
+                "mappings": USERS_INDEX_MAPPINGS,
+            },
+        )
+
+    async def get_current_index(self) -> Optional[str]:
+        """Индекс за алиасом; старый индекс без алиаса, созданный первым upsert'ом, тоже считается текущим."""
+        if await self.es_client.indices.exists_alias(name=self.alias):
+            result = await self.es_client.indices.get_alias(name=self.alias)
+            return next(iter(result.body))
+        if await self.es_client.indices.exists(index=self.alias):
+            return self.alias
+        return None
+
+    async def reindex(self, delete_old: bool = False, requests_per_second: Optional[float] = None) -> str:
+        """
+        Создаёт следующую версию индекса, переливает в неё документы и атомарно переключает алиас.
+        Изменённые во время переливки документы догоняются по updated_at до переключения и полным проходом
+        после него: в прежний индекс тогда уже никто не пишет, а внешние версии не дают старой копии
+        перетереть документ, записанный через алиас. Удалённые за это время документы удаляются и из нового.
+        """
+        await self.put_index_template()
+        source_index = await self.get_current_index()
+        new_index = self._get_index_name(await self._get_next_version())
+        await self.es_client.indices.create(
+            index=new_index,
+            settings={"refresh_interval": "-1", "number_of_replicas": 0},
+        )
+        self.logger.info(f"Elasticsearch index {new_index} created.")
+        if source_index is None:
+            await self._swap_alias(None, new_index)
+            await self._restore_index_settings(new_index)
+            return new_index
+
+        started_at = int(time.time())
+        await self._reindex(source_index, new_index, requests_per_second=requests_per_second)
+        await self._reindex(source_index, new_index, updated_since=started_at)
+        # Индекс без алиаса удаляется при переключении, поэтому последний проход по нему идёт до переключения,
+        # а запись в него на это время закрыта. Outbox повторит отклонённые документы уже в новый индекс.
+        is_legacy = source_index == self.alias
+        if is_legacy:
+            await self._set_write_block(source_index, True)
+        try:
+            if is_legacy:
+                await self._reindex(source_index, new_index)
+            await self._restore_index_settings(new_index)
+            await self._delete_missing_documents(source_index, new_index)
+            await self._swap_alias(source_index, new_index)
+        except Exception:
+            if is_legacy:
+                await self._set_write_block(source_index, False)
+            raise
+        if is_legacy:
+            return new_index
+        await self._reindex(source_index, new_index)
+
+        if delete_old:
+            await self.es_client.indices.delete(index=source_index)
+            self.logger.info(f"Elasticsearch index {source_index} deleted.")
+        return new_index
+
+    async def _reindex(
+            self,
+            source_index: str,
+            dest_index: str,
+            updated_since: Optional[int] = None,
+            requests_per_second: Optional[float] = None,
+    ) -> None:
+        source = {"index": source_index}
+        if updated_since is not None:
+            source["query"] = {"range": {"updated_at": {"gte": updated_since}}}
+        result = await self.es_client.reindex(
+            source=source,
+            dest={"index": dest_index, "version_type": "external"},
+            conflicts="proceed",
+            slices="auto",
+            requests_per_second=requests_per_second or -1,
+            wait_for_completion=False,
+        )
+        task_id = result.body["task"]
+        while True:
+            task = await self.es_client.tasks.get(task_id=task_id)
+            status = task.body["task"]["status"]
+            if task.body["completed"]:
+                break
+            self.logger.info(f"Reindex {source_index} -> {dest_index}: {status['created'] + status['updated']}/"
+                             f"{status['total']} documents.")
+            await asyncio.sleep(REINDEX_POLL_INTERVAL)
+        response = task.body.get("response", {})
+        if task.body.get("error") or response.get("failures"):
+            raise RuntimeError(f"Reindex {source_index} -> {dest_index} failed: "
+                               f"{task.body.get('error') or response['failures'][:5]}")
+        self.logger.info(f"Reindex {source_index} -> {dest_index} finished: "
+                         f"{response.get('created', 0)} created, {response.get('updated', 0)} updated.")
+
+    async def _delete_missing_documents(self, source_index: str, dest_index: str) -> None:
+        """Удаляет из dest_index документы, которых уже нет в source_index."""
+        ids = []
+        deleted = 0
+        hits = async_scan(self.es_client, index=dest_index, query={"_source": False}, size=REINDEX_CHUNK_SIZE)
+        async for hit in hits:
+            ids.append(hit["_id"])
+            if len(ids) == REINDEX_CHUNK_SIZE:
+                deleted += await self._delete_missing_chunk(source_index, dest_index, ids)
+                ids = []
+        if ids:
+            deleted += await self._delete_missing_chunk(source_index, dest_index, ids)
+        self.logger.info(f"Reindex {source_index} -> {dest_index}: {deleted} deleted documents removed.")
+
+    async def _delete_missing_chunk(self, source_index: str, dest_index: str, ids: list[str]) -> int:
+        result = await self.es_client.mget(index=source_index, ids=ids, source=False)
+        missing_ids = [document["_id"] for document in result.body["docs"] if not document.get("found")]
+        if missing_ids:
+            await async_bulk(
+                self.es_client,
+                [{"_op_type": "delete", "_index": dest_index, "_id": document_id} for document_id in missing_ids],
+                raise_on_error=False,
+            )
+        return len(missing_ids)
+
+    async def _set_write_block(self, index: str, blocked: bool) -> None:
+        await self.es_client.indices.put_settings(index=index, settings={"index.blocks.write": blocked})
+
+    async def _restore_index_settings(self, index: str) -> None:
+        await self.es_client.indices.put_settings(
+            index=index,
+            settings={"refresh_interval": self.refresh_interval, "number_of_replicas": self.number_of_replicas},
+        )
+        await self.es_client.indices.refresh(index=index)
+
+    async def _swap_alias(self, old_index: Optional[str], new_index: str) -> None:
+        actions = []
+        if old_index == self.alias:
+            # Индекс без алиаса занимает его имя, поэтому удаляется в том же атомарном запросе.
+            actions.append({"remove_index": {"index": old_index}})
+        elif old_index:
+            actions.append({"remove": {"index": old_index, "alias": self.alias}})
+        actions.append({"add": {"index": new_index, "alias": self.alias, "is_write_index": True}})
+        await self.es_client.indices.update_aliases(actions=actions)
+        self.logger.info(f"Alias {self.alias} switched to {new_index}.")
+
+    async def _get_next_version(self) -> int:
+        result = await self.es_client.indices.get(index=f"{self.alias}_v*", allow_no_indices=True)
+        pattern = re.compile(rf"^{re.escape(self.alias)}_v(\d+)$")
+        versions = [int(match.group(1)) for index in result.body if (match := pattern.match(index))]
+        return max(versions, default=0) + 1
+
+    def _get_index_name(self, version: int) -> str:
+        return f"{self.alias}_v{version}"
+
+
+def get_profiles_index_manager() -> ProfilesIndexManager:
+    return ProfilesIndexManager(
+        es_client=get_es_client(),
+        logger=get_logger(),
+        alias=settings.elastic.ELASTIC_USERS_INDEX,
+        refresh_interval=settings.elastic.ELASTIC_USERS_REFRESH_INTERVAL,
+        number_of_shards=settings.elastic.ELASTIC_USERS_SHARDS,
+        number_of_replicas=settings.elastic.ELASTIC_USERS_REPLICAS,
+    )
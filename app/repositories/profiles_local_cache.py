@@ -0,0 +1,111 @@
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional, Union
+
+from app.configs.main import settings
+from app.interfaces.repositories import ProfilesLocalCacheInterface
+from app.schemas.users import UserSchema
+
+
+class ProfilesLocalCache(ProfilesLocalCacheInterface):
+    """LRU-кэш UserSchema внутри воркера, ограниченный по TTL, числу записей и размеру."""
+
+    _instance: Optional["ProfilesLocalCache"] = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, ttl: int, max_entries: int, max_bytes: int):
+        if not hasattr(self, "entries"):
+            self.ttl = ttl
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self.entries: OrderedDict[str, tuple[float, int, UserSchema]] = OrderedDict()
+            self.size_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+
+    def get_user(self, user_id: Union[uuid.UUID, str]) -> Optional[UserSchema]:
+        key = str(user_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, user = entry
+        if expires_at < time.monotonic():
+            self._pop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def get_users(self, user_ids: list[uuid.UUID]) -> dict[uuid.UUID, UserSchema]:
+        users = {}
+        for user_id in user_ids:
+            user = self.get_user(user_id)
+            if user:
+                users[user_id] = user
+        return users
+
+    def set_user(self, user: UserSchema) -> None:
+        key = str(user.user_id)
+        if key in self.entries:
+            self._pop(key)
+        # Размер оценивается по сериализованному представлению, а не по объектам в памяти.
+        size = len(user.model_dump_json())
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, size, user)
+        self.size_bytes += size
+        while len(self.entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            oldest_key = next(iter(self.entries))
+            self._pop(oldest_key)
+            self.evictions += 1
+
+    def set_users(self, users: list[UserSchema]) -> None:
+        for user in users:
+            self.set_user(user)
+
+    def invalidate(self, user_id: Union[uuid.UUID, str]) -> None:
+        if self._pop(str(user_id)):
+            self.invalidations += 1
+
+    async def consume_invalidations(self, user_ids: AsyncIterator[str]) -> None:
+        async for user_id in user_ids:
+            self.invalidate(user_id)
+
+    def get_stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "entries": len(self.entries),
+            "size_bytes": self.size_bytes,
+        }
+
+    def _pop(self, key: str) -> bool:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size_bytes -= entry[1]
+        return True
+
+
+def get_profiles_local_cache() -> ProfilesLocalCache:
+    return ProfilesLocalCache(
+        ttl=settings.cache.PROFILE_LOCAL_CACHE_TTL,
+        max_entries=settings.cache.PROFILE_LOCAL_CACHE_MAX_ENTRIES,
+        max_bytes=settings.cache.PROFILE_LOCAL_CACHE_MAX_BYTES,
+    )
@@ -1,49 +1,133 @@
+import base64
 import uuid
-from typing import Optional, Union
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Union
 
-from sqlalchemy import and_, desc, select, update
+from pydantic import ValidationError
+from sqlalchemy import (
+    Boolean,
+    Uuid,
+    and_,
+    any_,
+    column,
+    delete,
+    desc,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased
 
-from app.database import get_async_session_maker
-from app.exceptions.profiles import LikeExistsException, MatchExistsException
-from app.filters.base import BaseFilter
+from app.database import SessionRouter, get_async_session_maker, get_session_router
+from app.exceptions.profiles import InvalidCursorException, LikeExistsException, MatchExistsException
+from app.filters.likes import LikesFilter
 from app.interfaces.repositories import ProfilesPostgresRepositoryInterface
 from app.models.likes import Likes, LikeStatusEnum
-from app.models.matches import Matches
+from app.models.matches import Matches, MatchStatusEnum
+from app.models.outbox import Outbox, OutboxEventTypeEnum
 from app.models.users import Users
-from app.schemas.likes import LikeCreateSchema, LikeSchema
+from app.schemas.likes import LikeCreateSchema, LikeSchema, LikesCursorSchema, LikesPageSchema
 from app.schemas.matches import MatchCreateSchema, MatchSchema
+from app.schemas.outbox import OutboxBacklogSchema, OutboxEventSchema
 from app.schemas.users import TelegramUserInSchema, UserSchema, UserUpdatePhotoSchema, UserUpdateSchema
+from app.utils import get_pair_key
+
+# Ключ advisory-блокировки: пачки outbox разбирает один воркер за раз, порядок событий сохраняется.
+OUTBOX_RELAY_LOCK_ID = 7_140_215
 
 
 class ProfilesPostgresRepository(ProfilesPostgresRepositoryInterface):
 
-    def __init__(self, session_maker: async_sessionmaker[AsyncSession]):
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            session_router: Optional[SessionRouter] = None,
+    ):
+        """
+        session_maker всегда смотрит в primary: записи, включая вход через upsert по telegram_id,
+        лайки и проверка взаимности, где отставание реплики недопустимо. Чтения через _get_read_session
+        может обслужить реплика.
+        """
         self.session_maker = session_maker
+        self.session_router = session_router
         self.users_table = Users
         self.likes_table = Likes
         self.matches_table = Matches
-
-    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[UserSchema]:
-        query = (
-            select(self.users_table)
-            .where(self.users_table.telegram_id == telegram_id)
-        )
-        async with self.session_maker() as session:
-            result = await session.execute(query)
-        user = result.scalar_one_or_none()
-        return UserSchema.model_validate(user) if user else None
+        self.outbox_table = Outbox
 
     async def get_user_by_id(self, user_id: uuid.UUID) -> Optional[UserSchema]:
         query = select(self.users_table).where(self.users_table.user_id == user_id)
-        async with self.session_maker() as session:
+        async with self._get_read_session(user_id) as session:
             result = await session.execute(query)
         user = result.scalar_one_or_none()
         if user is None:
             return None
         return UserSchema.model_validate(user)
 
+    async def get_users_by_ids(self, user_ids: list[uuid.UUID]) -> list[UserSchema]:
+        """Пользователи одним запросом в порядке переданных id."""
+        if not user_ids:
+            return []
+        query = (
+            select(self.users_table)
+            .where(self.users_table.user_id == any_(literal(user_ids, type_=ARRAY(Uuid))))
+        )
+        async with self._get_read_session() as session:
+            result = await session.execute(query)
+        users = {user.user_id: user for user in result.scalars()}
+        return [UserSchema.model_validate(users[user_id]) for user_id in user_ids if user_id in users]
+
+    async def get_feed_users_batch(self, after_user_id: Optional[uuid.UUID], limit: int) -> list[UserSchema]:
+        """Пользователи с заполненным городом или координатами, keyset-пагинация по user_id."""
+        query = (
+            select(self.users_table)
+            .where(or_(self.users_table.city.is_not(None), self.users_table.latitude.is_not(None)))
+            .order_by(self.users_table.user_id)
+            .limit(limit)
+        )
+        if after_user_id:
+            query = query.where(self.users_table.user_id > after_user_id)
+        async with self._get_read_session() as session:
+            result = await session.execute(query)
+        return [UserSchema.model_validate(user) for user in result.scalars()]
+
+    async def stream_users(
+            self, after_user_id: Optional[uuid.UUID], chunk_size: int
+    ) -> AsyncIterator[list[UserSchema]]:
+        """Все пользователи по возрастанию user_id через серверный курсор, пачками по chunk_size."""
+        query = select(self.users_table).order_by(self.users_table.user_id)
+        if after_user_id:
+            query = query.where(self.users_table.user_id > after_user_id)
+        async with self._get_read_session() as session:
+            result = await session.stream_scalars(query, execution_options={"yield_per": chunk_size})
+            async for users in result.partitions():
+                yield [UserSchema.model_validate(user) for user in users]
+                # Сущности пачки больше не нужны, identity map не должна расти вместе с таблицей.
+                session.expunge_all()
+
+    async def get_existing_user_ids(self, user_ids: list[uuid.UUID]) -> set[uuid.UUID]:
+        """
+        Читается с primary: по ответу удаляются документы из индекса, и только что зарегистрированный
+        пользователь, которого ещё нет на реплике, не должен считаться лишним.
+        """
+        if not user_ids:
+            return set()
+        query = (
+            select(self.users_table.user_id)
+            .where(self.users_table.user_id == any_(literal(user_ids, type_=ARRAY(Uuid))))
+        )
+        async with self.session_maker() as session:
+            result = await session.execute(query)
+        return set(result.scalars())
+
     async def update_user_info(
             self, user_id: uuid.UUID, user_data: Union[UserUpdateSchema, UserUpdatePhotoSchema]
     ) -> Optional[UserSchema]:
@@ -54,20 +138,38 @@ class ProfilesPostgresRepository(ProfilesPostgresRepositoryInterface):
         )
         async with self.session_maker() as session:
             result = await session.execute(query)
+            user = result.scalar_one_or_none()
+            if user:
+                user = UserSchema.model_validate(user)
+                self._add_outbox_event(session, OutboxEventTypeEnum.user_updated, user.model_dump(mode="json"))
             await session.commit()
-        user = result.scalar_one_or_none()
-        return UserSchema.model_validate(user) if user else None
+        if user and self.session_router:
+            self.session_router.pin_user(user_id)
+        return user
 
-    async def create_user_with_telegram_user_data(self, user_data: TelegramUserInSchema) -> UserSchema:
-        user = self.users_table(
-            telegram_id=user_data.id,
-            name=user_data.first_name,
+    async def upsert_user_by_telegram_id(self, user_data: TelegramUserInSchema) -> tuple[UserSchema, bool]:
+        """
+        Вход одним запросом: INSERT ... ON CONFLICT (telegram_id) без гонки между параллельными логинами.
+        Пустой DO UPDATE нужен, чтобы RETURNING вернул и существующую строку; xmax = 0 только у вставленной.
+        Имя из Telegram берётся лишь при создании и не перетирает отредактированное в профиле.
+        """
+        stmt = (
+            insert(self.users_table)
+            .values(telegram_id=user_data.id, name=user_data.first_name)
+            .on_conflict_do_update(
+                index_elements=[self.users_table.telegram_id],
+                set_={"telegram_id": self.users_table.telegram_id},
+            )
+            .returning(self.users_table, literal_column("xmax = 0", Boolean).label("inserted"))
         )
         async with self.session_maker() as session:
-            session.add(user)
+            result = await session.execute(stmt)
+            user, inserted = result.one()
+            user = UserSchema.model_validate(user)
+            if inserted:
+                self._add_outbox_event(session, OutboxEventTypeEnum.user_updated, user.model_dump(mode="json"))
             await session.commit()
-            await session.refresh(user)
-        return UserSchema.model_validate(user)
+        return user, inserted
 
     async def create_like(self, user_id: uuid.UUID, like_data: LikeCreateSchema) -> LikeSchema:
         like = self.likes_table(
@@ -77,27 +179,69 @@ class ProfilesPostgresRepository(ProfilesPostgresRepositoryInterface):
         async with self.session_maker() as session:
             try:
                 session.add(like)
-                await session.commit()
+                await session.flush()
             except IntegrityError:
                 raise LikeExistsException
             await session.refresh(like)
-        return LikeSchema.model_validate(like)
+            like = LikeSchema.model_validate(like)
+            self._add_outbox_event(
+                session,
+                OutboxEventTypeEnum.like_created,
+                like.model_dump(mode="json"),
+                get_pair_key(like.user_id, like.liked_user_id),
+            )
+            await session.commit()
+        return like
 
-    async def get_my_likes(self, user_id: uuid.UUID, filters: BaseFilter) -> list[LikeSchema]:
-        query = (
+    async def get_my_likes(self, user_id: uuid.UUID, filters: LikesFilter) -> LikesPageSchema:
+        """
+        Страница входящих лайков одним запросом: новые лайки страницы переводятся в seen
+        data-modifying CTE, а наружу отдаются со статусом до обновления.
+        Страницы keyset по (created_at, like_id) и читаются из частичного индекса ix_likes_inbox.
+        """
+        page = (
             select(self.likes_table)
             .where(and_(
                 self.likes_table.liked_user_id == user_id,
                 self.likes_table.status != LikeStatusEnum.match,
             ))
-            .order_by(desc(self.likes_table.created_at))
-            .offset(filters.offset)
+            .order_by(desc(self.likes_table.created_at), desc(self.likes_table.like_id))
             .limit(filters.limit)
         )
+        if filters.cursor:
+            cursor = self._decode_likes_cursor(filters.cursor)
+            page = page.where(
+                tuple_(self.likes_table.created_at, self.likes_table.like_id) < (cursor.created_at, cursor.like_id)
+            )
+        else:
+            page = page.offset(filters.offset)
+        page = page.cte("page")
+        mark_seen = (
+            update(self.likes_table)
+            .where(and_(
+                self.likes_table.like_id == page.c.like_id,
+                self.likes_table.status == LikeStatusEnum.new,
+            ))
+            .values(status=LikeStatusEnum.seen)
+            .returning(self.likes_table.like_id)
+            .cte("mark_seen")
+        )
+        page_likes = aliased(self.likes_table, page)
+        query = (
+            select(page_likes)
+            .add_cte(mark_seen)
+            .order_by(desc(page_likes.created_at), desc(page_likes.like_id))
+        )
         async with self.session_maker() as session:
             result = await session.execute(query)
-        likes = [LikeSchema.model_validate(like) for like in result.scalars()]
-        return likes
+            likes = [LikeSchema.model_validate(like) for like in result.scalars()]
+            await session.commit()
+        next_cursor = None
+        if len(likes) == filters.limit:
+            next_cursor = self._encode_likes_cursor(
+                LikesCursorSchema(created_at=likes[-1].created_at, like_id=likes[-1].like_id)
+            )
+        return LikesPageSchema(likes=likes, next_cursor=next_cursor)
 
     async def check_mutual_like(self, user_id: uuid.UUID, liked_user_id: uuid.UUID) -> Optional[LikeSchema]:
         query = (
@@ -133,14 +277,153 @@ class ProfilesPostgresRepository(ProfilesPostgresRepositoryInterface):
         async with self.session_maker() as session:
             try:
                 session.add(match)
-                await session.commit()
+                await session.flush()
             except IntegrityError:
                 raise MatchExistsException
-        return MatchSchema.model_validate(match)
+            await session.refresh(match)
+            match = MatchSchema.model_validate(match)
+            self._add_outbox_event(
+                session,
+                OutboxEventTypeEnum.match_created,
+                match.model_dump(mode="json"),
+                get_pair_key(match.user1_id, match.user2_id),
+            )
+            await session.commit()
+        return match
+
+    async def resolve_mutual_like(self, user_id: uuid.UUID, liked_user_id: uuid.UUID) -> Optional[MatchSchema]:
+        matches = await self.resolve_mutual_likes([(user_id, liked_user_id)])
+        return matches[0] if matches else None
+
+    async def resolve_mutual_likes(self, pairs: list[tuple[uuid.UUID, uuid.UUID]]) -> list[MatchSchema]:
+        """
+        Проверка взаимности, мэтчи и перевод лайков в match для всей пачки пар одним запросом с CTE.
+        Пары хранятся упорядоченными, поэтому встречные сообщения о лайках сходятся в ON CONFLICT DO NOTHING,
+        и статусы обновляет только тот, кто вставил мэтч. Возвращает мэтчи, созданные этим вызовом.
+        """
+        canonical_pairs = {
+            tuple(sorted([uuid.UUID(str(user_id)), uuid.UUID(str(other_user_id))]))
+            for user_id, other_user_id in pairs
+        }
+        if not canonical_pairs:
+            return []
+        candidates = values(
+            column("match_id", Uuid), column("user1_id", Uuid), column("user2_id", Uuid), name="candidates"
+        ).data([(uuid.uuid4(), user1_id, user2_id) for user1_id, user2_id in canonical_pairs])
+        like = aliased(self.likes_table)
+        reverse_like = aliased(self.likes_table)
+        new_match = (
+            insert(self.matches_table)
+            .from_select(
+                ["match_id", "user1_id", "user2_id", "status"],
+                select(
+                    candidates.c.match_id,
+                    candidates.c.user1_id,
+                    candidates.c.user2_id,
+                    literal(MatchStatusEnum.new, self.matches_table.status.type),
+                )
+                .join(like, and_(like.user_id == candidates.c.user1_id, like.liked_user_id == candidates.c.user2_id))
+                .join(reverse_like, and_(
+                    reverse_like.user_id == candidates.c.user2_id,
+                    reverse_like.liked_user_id == candidates.c.user1_id,
+                )),
+            )
+            .on_conflict_do_nothing()
+            .returning(self.matches_table)
+            .cte("new_match")
+        )
+        likes_pair = tuple_(self.likes_table.user_id, self.likes_table.liked_user_id)
+        matched_likes = (
+            update(self.likes_table)
+            .where(or_(
+                likes_pair.in_(select(new_match.c.user1_id, new_match.c.user2_id)),
+                likes_pair.in_(select(new_match.c.user2_id, new_match.c.user1_id)),
+            ))
+            .values(status=LikeStatusEnum.match)
+            .returning(self.likes_table.like_id)
+            .cte("matched_likes")
+        )
+        query = select(new_match).add_cte(matched_likes)
+        async with self.session_maker() as session:
+            result = await session.execute(query)
+            matches = [MatchSchema.model_validate(match._mapping) for match in result.all()]
+            for match in matches:
+                self._add_outbox_event(
+                    session,
+                    OutboxEventTypeEnum.match_created,
+                    match.model_dump(mode="json"),
+                    get_pair_key(match.user1_id, match.user2_id),
+                )
+            await session.commit()
+        return matches
+
+    @asynccontextmanager
+    async def lock_outbox_events(self, limit: int) -> AsyncIterator[list[OutboxEventSchema]]:
+        """
+        Самые старые события outbox, заблокированные до выхода из контекста. При успешном выходе
+        удаляются в той же транзакции события, оставшиеся в отданном списке: вызывающий может убрать
+        из него недоставленные. При исключении остаются все. Если пачку уже разбирает другой воркер,
+        отдаётся пустой список.
+        """
+        async with self.session_maker() as session:
+            async with session.begin():
+                locked = await session.scalar(select(func.pg_try_advisory_xact_lock(OUTBOX_RELAY_LOCK_ID)))
+                if not locked:
+                    yield []
+                    return
+                query = (
+                    select(self.outbox_table)
+                    .order_by(self.outbox_table.outbox_id)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+                result = await session.execute(query)
+                events = [OutboxEventSchema.model_validate(event) for event in result.scalars()]
+                yield events
+                if events:
+                    await session.execute(
+                        delete(self.outbox_table)
+                        .where(self.outbox_table.outbox_id.in_([event.outbox_id for event in events]))
+                    )
+
+    async def get_outbox_backlog(self) -> OutboxBacklogSchema:
+        """Сколько событий ждёт отправки и сколько секунд ждёт самое старое из них."""
+        oldest_age = func.extract("epoch", func.localtimestamp() - func.min(self.outbox_table.created_at))
+        query = select(func.count(), func.coalesce(oldest_age, 0)).select_from(self.outbox_table)
+        async with self.session_maker() as session:
+            pending, oldest_age_seconds = (await session.execute(query)).one()
+        return OutboxBacklogSchema(pending=pending, oldest_age_seconds=float(oldest_age_seconds))
+
+    @staticmethod
+    def _encode_likes_cursor(cursor: LikesCursorSchema) -> str:
+        return base64.urlsafe_b64encode(cursor.model_dump_json().encode()).decode()
+
+    @staticmethod
+    def _decode_likes_cursor(cursor: str) -> LikesCursorSchema:
+        try:
+            return LikesCursorSchema.model_validate_json(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, ValidationError):
+            raise InvalidCursorException
+
+    def _get_read_session(self, user_id: Optional[uuid.UUID] = None) -> AsyncSession:
+        if self.session_router is None:
+            return self.session_maker()
+        return self.session_router.get_read_session_maker(user_id)()
+
+    def _add_outbox_event(
+            self,
+            session: AsyncSession,
+            event_type: OutboxEventTypeEnum,
+            payload: dict,
+            partition_key: Optional[str] = None,
+    ) -> None:
+        session.add(self.outbox_table(event_type=event_type, payload=payload, partition_key=partition_key))
 
 
 def get_profiles_pg_repository() -> ProfilesPostgresRepository:
     session_maker = get_async_session_maker()
+    session_router = get_session_router()
     return ProfilesPostgresRepository(
         session_maker=session_maker,
+        session_router=session_router,
     )
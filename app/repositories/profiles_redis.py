@@ -1,9 +1,58 @@
+import json
+import time
 from typing import Optional
 
 import redis.asyncio as redis
 
 from app.configs.main import settings
 from app.interfaces.repositories import ProfileQueuesRedisRepositoryInterface
+from app.schemas.feed import FeedCursorSchema, QueuePopSchema, RefillLeaseEnum
+
+# KEYS: очередь, множество id в очереди, аренда пополнения
+# ARGV: count, токен аренды, TTL аренды (мс), low-watermark, можно ли брать аренду (0/1)
+POP_WITH_LEASE_SCRIPT = """
+local ids = redis.call('LPOP', KEYS[1], ARGV[1])
+if ids then
+    redis.call('SREM', KEYS[2], unpack(ids))
+else
+    ids = {}
+end
+local length = redis.call('LLEN', KEYS[1])
+local lease = 0
+if ARGV[5] == '1' and (#ids == 0 or length < tonumber(ARGV[4])) then
+    if redis.call('SET', KEYS[3], ARGV[2], 'NX', 'PX', ARGV[3]) then
+        lease = 1
+    else
+        lease = 2
+    end
+end
+return {ids, length, lease}
+"""
+
+# KEYS: очередь, множество id в очереди
+# ARGV: максимальная длина очереди, id для добавления
+PUSH_UNIQUE_SCRIPT = """
+local room = tonumber(ARGV[1]) - redis.call('LLEN', KEYS[1])
+local pushed = 0
+for i = 2, #ARGV do
+    if pushed >= room then
+        break
+    end
+    if redis.call('SADD', KEYS[2], ARGV[i]) == 1 then
+        redis.call('RPUSH', KEYS[1], ARGV[i])
+        pushed = pushed + 1
+    end
+end
+return pushed
+"""
+
+# KEYS: аренда пополнения; ARGV: токен владельца
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
 
 
 class ProfileQueuesRedisRepository(ProfileQueuesRedisRepositoryInterface):
@@ -20,6 +69,9 @@ class ProfileQueuesRedisRepository(ProfileQueuesRedisRepositoryInterface):
             encoding="utf-8",
             decode_responses=True,
         )
+        self.pop_with_lease_script = self.redis.register_script(POP_WITH_LEASE_SCRIPT)
+        self.push_unique_script = self.redis.register_script(PUSH_UNIQUE_SCRIPT)
+        self.release_lease_script = self.redis.register_script(RELEASE_LEASE_SCRIPT)
 
     async def connect(self):
         await self.redis.ping()
@@ -32,12 +84,119 @@ class ProfileQueuesRedisRepository(ProfileQueuesRedisRepositoryInterface):
         queue = await self.redis.lrange(user_id, 0, -1)
         return queue if queue else []
 
-    async def pop_from_queue(self, user_id: str) -> Optional[str]:
-        return await self.redis.lpop(user_id)
+    async def get_users_queues(self, user_ids: list[str]) -> dict[str, list[str]]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.lrange(user_id, 0, -1)
+            queues = await pipe.execute()
+        return dict(zip(user_ids, queues))
+
+    async def pop_from_queue_with_lease(
+            self, user_id: str, count: int, lease_token: str, low_watermark: int, acquire_lease: bool = True
+    ) -> QueuePopSchema:
+        """
+        Атомарно снимает до count id и, если очередь пуста или ниже low-watermark, пытается взять аренду
+        на пополнение. Пополнять очередь должен только получивший аренду.
+        """
+        target_user_ids, queue_length, lease = await self.pop_with_lease_script(
+            keys=[user_id, self._queue_members_key(user_id), self._refill_lease_key(user_id)],
+            args=[
+                count,
+                lease_token,
+                settings.feed.FEED_REFILL_LEASE_TTL * 1000,
+                low_watermark,
+                int(acquire_lease),
+            ],
+        )
+        return QueuePopSchema(user_ids=target_user_ids, queue_length=queue_length, lease=RefillLeaseEnum(lease))
 
     async def add_to_queue(self, user_id: str, target_user_ids: list[str]) -> None:
+        """Добавляет только id, которых ещё нет в очереди, не превышая FEED_QUEUE_MAX_LENGTH."""
         if target_user_ids:
-            await self.redis.rpush(user_id, *target_user_ids)
+            await self.push_unique_script(
+                keys=[user_id, self._queue_members_key(user_id)],
+                args=[settings.feed.FEED_QUEUE_MAX_LENGTH, *target_user_ids],
+            )
+
+    async def add_to_queues(self, queues: dict[str, list[str]]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id, target_user_ids in queues.items():
+                if target_user_ids:
+                    await self.push_unique_script(
+                        keys=[user_id, self._queue_members_key(user_id)],
+                        args=[settings.feed.FEED_QUEUE_MAX_LENGTH, *target_user_ids],
+                        client=pipe,
+                    )
+            await pipe.execute()
+
+    async def add_to_seen(self, user_id: str, target_user_id: str) -> None:
+        """Просмотренные анкеты: sorted set со временем просмотра, ограниченный по размеру и возрасту."""
+        key = self._seen_key(user_id)
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(key, {target_user_id: now})
+            pipe.zremrangebyscore(key, "-inf", now - settings.feed.FEED_SEEN_TTL)
+            pipe.zremrangebyrank(key, 0, -settings.feed.FEED_SEEN_MAX_SIZE - 1)
+            pipe.expire(key, settings.feed.FEED_SEEN_TTL)
+            await pipe.execute()
+
+    async def get_seen_users(self, user_id: str) -> list[str]:
+        return await self.redis.zrange(self._seen_key(user_id), 0, -1)
+
+    async def get_seen_users_many(self, user_ids: list[str]) -> dict[str, list[str]]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.zrange(self._seen_key(user_id), 0, -1)
+            seen = await pipe.execute()
+        return dict(zip(user_ids, seen))
+
+    async def get_feed_cursor(self, user_id: str) -> Optional[FeedCursorSchema]:
+        cursor = await self.redis.get(self._feed_cursor_key(user_id))
+        return FeedCursorSchema.model_validate_json(cursor) if cursor else None
+
+    async def set_feed_cursor(self, user_id: str, cursor: Optional[FeedCursorSchema]) -> None:
+        if cursor is None:
+            await self.redis.delete(self._feed_cursor_key(user_id))
+            return
+        await self.redis.set(
+            self._feed_cursor_key(user_id), cursor.model_dump_json(), ex=settings.feed.FEED_PIT_KEEP_ALIVE
+        )
+
+    async def get_feed_pool(self, user_id: str) -> list[dict]:
+        candidates = await self.redis.get(self._feed_pool_key(user_id))
+        return json.loads(candidates) if candidates else []
+
+    async def set_feed_pool(self, user_id: str, candidates: list[dict]) -> None:
+        """Кандидаты из ранжированного пула, не попавшие в очередь; живут не дольше курсора."""
+        if not candidates:
+            await self.redis.delete(self._feed_pool_key(user_id))
+            return
+        await self.redis.set(
+            self._feed_pool_key(user_id), json.dumps(candidates), ex=settings.feed.FEED_PIT_KEEP_ALIVE
+        )
+
+    async def release_refill_lease(self, user_id: str, lease_token: str) -> None:
+        await self.release_lease_script(keys=[self._refill_lease_key(user_id)], args=[lease_token])
+
+    @staticmethod
+    def _queue_members_key(user_id: str) -> str:
+        return f"queue_members:{user_id}"
+
+    @staticmethod
+    def _seen_key(user_id: str) -> str:
+        return f"seen:{user_id}"
+
+    @staticmethod
+    def _feed_cursor_key(user_id: str) -> str:
+        return f"feed_cursor:{user_id}"
+
+    @staticmethod
+    def _feed_pool_key(user_id: str) -> str:
+        return f"feed_pool:{user_id}"
+
+    @staticmethod
+    def _refill_lease_key(user_id: str) -> str:
+        return f"refill_lease:{user_id}"
 
 
 def get_profile_queues_redis_repository() -> ProfileQueuesRedisRepository:
@@ -0,0 +1,27 @@
+import enum
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+class RefillLeaseEnum(enum.Enum):
+    not_requested = 0
+    acquired = 1
+    busy = 2
+
+
+class FeedCursorSchema(BaseModel):
+    pit_id: str
+    query_hash: str
+    search_after: Optional[list[Any]] = None
+
+
+class FeedPageSchema(BaseModel):
+    candidates: list[dict[str, Any]]
+    cursor: Optional[FeedCursorSchema] = None
+
+
+class QueuePopSchema(BaseModel):
+    user_ids: list[str]
+    queue_length: int
+    lease: RefillLeaseEnum
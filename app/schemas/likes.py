@@ -11,6 +11,15 @@ class LikeCreateSchema(BaseModel):
     liked_user_id: uuid.UUID
 
 
+class LikeEventSchema(BaseModel):
+    user_id: uuid.UUID
+    liked_user_id: uuid.UUID
+
+
+class SkipCreateSchema(BaseModel):
+    skipped_user_id: uuid.UUID
+
+
 class LikeSchema(BaseModel):
     like_id: uuid.UUID
     user_id: uuid.UUID
@@ -34,3 +43,13 @@ class LikeSchema(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class LikesCursorSchema(BaseModel):
+    created_at: datetime.datetime
+    like_id: uuid.UUID
+
+
+class LikesPageSchema(BaseModel):
+    likes: list[LikeSchema]
+    next_cursor: Optional[str] = None
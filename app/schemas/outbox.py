@@ -0,0 +1,22 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.outbox import OutboxEventTypeEnum
+
+
+class OutboxEventSchema(BaseModel):
+    outbox_id: int
+    event_type: OutboxEventTypeEnum
+    payload: dict
+    partition_key: Optional[str] = None
+    created_at: Optional[datetime.datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class OutboxBacklogSchema(BaseModel):
+    pending: int
+    oldest_age_seconds: float
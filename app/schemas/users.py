@@ -1,7 +1,8 @@
+import datetime
 import uuid
 from typing import Optional
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 
 from app.models.users import UserSexEnum, ZodiacEnum
 
@@ -31,6 +32,9 @@ class UserSchema(BaseModel):
     interests: Optional[list[str]] = None
     city: Optional[str] = None
     zodiac: Optional[ZodiacEnum] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    updated_at: Optional[datetime.datetime] = None
 
     def dict(self, **kwargs):
         data = super().dict(**kwargs)
@@ -48,20 +52,31 @@ class UserSchema(BaseModel):
 
 class UserUpdateSchema(BaseModel):
     name: Optional[str] = None
-    age: Optional[int] = None
+    # В индексе age хранится как short, за его пределы значение не должно выходить.
+    age: Optional[int] = Field(None, ge=0, le=150)
     sex: Optional[UserSexEnum] = None
     bio: Optional[str] = None
     interests: Optional[list[str]] = None
     city: Optional[str] = None
     zodiac: Optional[ZodiacEnum] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class UserUpdatePhotoSchema(BaseModel):
     photo_url: str
 
 
+class GeoPointSchema(BaseModel):
+    lat: float
+    lon: float
+
+
 class UserDocumentSchema(BaseModel):
     user_id: str
     sex: Optional[str] = None
+    age: Optional[int] = None
     interests: Optional[list[str]] = None
     city: Optional[str] = None
+    location: Optional[GeoPointSchema] = None
+    updated_at: Optional[int] = None
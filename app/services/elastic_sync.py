@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import aclosing
+from typing import Awaitable, Callable, Optional
+
+from app.interfaces.repositories import ProfilesElasticRepositoryInterface, ProfilesPostgresRepositoryInterface
+from app.logger import get_logger
+from app.repositories.profiles_es import get_profiles_es_repository
+from app.repositories.profiles_pg import get_profiles_pg_repository
+from app.schemas.users import UserSchema
+
+
+class ElasticSyncService:
+    """
+    Восстановление индекса пользователей из PG: потоковый backfill с чекпоинтом
+    и сверка содержимого с починкой только расходящихся документов.
+    """
+
+    def __init__(
+            self,
+            profiles_pg_repository: ProfilesPostgresRepositoryInterface,
+            profiles_elastic_repository: ProfilesElasticRepositoryInterface,
+            logger: logging.Logger,
+    ):
+        self.profiles_pg_repository = profiles_pg_repository
+        self.profiles_elastic_repository = profiles_elastic_repository
+        self.logger = logger
+
+    async def backfill(self, chunk_size: int, concurrency: int, checkpoint_path: Optional[str] = None) -> int:
+        """
+        Переиндексирует всех пользователей пачками по chunk_size, держа в работе не более concurrency _bulk.
+        Чекпоинт — последний user_id, до которого включительно все пачки записаны; с него продолжается
+        следующий запуск, после успешного завершения он удаляется. Возвращает число записанных документов.
+        """
+        after_user_id = self._read_checkpoint(checkpoint_path)
+        if after_user_id:
+            self.logger.info(f"Backfill resumed after user {after_user_id}.")
+        indexed = 0
+        rejected = 0
+
+        async def process(users: list[UserSchema]) -> None:
+            nonlocal indexed, rejected
+            rejected_users = await self.profiles_elastic_repository.index_users_documents(users)
+            self._log_rejected(rejected_users)
+            indexed += len(users) - len(rejected_users)
+            rejected += len(rejected_users)
+
+        def on_checkpoint(user_id: uuid.UUID) -> None:
+            self._write_checkpoint(checkpoint_path, user_id)
+
+        started_at = time.monotonic()
+        await self._run_chunks(after_user_id, chunk_size, concurrency, process, on_checkpoint)
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - started_at
+        self.logger.info(f"Backfill finished: {indexed} documents in {elapsed:.1f}s "
+                         f"({indexed / elapsed if elapsed else 0:.0f} docs/s), {rejected} rejected.")
+        return indexed
+
+    async def verify(self, chunk_size: int, concurrency: int, repair: bool) -> dict:
+        """
+        Сверяет PG и индекс: документы из PG сравниваются по хешу содержимого пачками через mget,
+        затем id из индекса проверяются на существование в PG. С repair расхождения исправляются.
+        """
+        stats = {"checked": 0, "outdated": 0, "extra": 0}
+
+        async def process(users: list[UserSchema]) -> None:
+            outdated_users = await self.profiles_elastic_repository.get_outdated_users(users)
+            stats["checked"] += len(users)
+            stats["outdated"] += len(outdated_users)
+            if outdated_users and repair:
+                self._log_rejected(await self.profiles_elastic_repository.index_users_documents(outdated_users))
+
+        await self._run_chunks(None, chunk_size, concurrency, process)
+
+        async for user_ids in self.profiles_elastic_repository.iterate_users_ids(chunk_size):
+            existing_user_ids = await self.profiles_pg_repository.get_existing_user_ids(
+                [uuid.UUID(user_id) for user_id in user_ids]
+            )
+            extra_ids = [user_id for user_id in user_ids if uuid.UUID(user_id) not in existing_user_ids]
+            stats["extra"] += len(extra_ids)
+            if extra_ids and repair:
+                await self.profiles_elastic_repository.delete_users_documents(extra_ids)
+
+        self.logger.info(f"Verify finished: {stats['checked']} checked, {stats['outdated']} outdated or missing, "
+                         f"{stats['extra']} extra documents{', repaired' if repair else ''}.")
+        return stats
+
+    async def _run_chunks(
+            self,
+            after_user_id: Optional[uuid.UUID],
+            chunk_size: int,
+            concurrency: int,
+            process: Callable[[list[UserSchema]], Awaitable[None]],
+            on_checkpoint: Optional[Callable[[uuid.UUID], None]] = None,
+    ) -> None:
+        """
+        Читает PG потоком и обрабатывает пачки параллельно. В памяти не больше concurrency пачек:
+        чтение курсора ждёт, пока освободится слот. Чекпоинт двигается только по непрерывному префиксу
+        завершённых пачек, поэтому после падения ничего не пропускается.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = set()
+        in_flight: dict[int, tuple[uuid.UUID, bool]] = {}
+        next_checkpoint = 0
+        failure: Optional[BaseException] = None
+
+        async def run(sequence: int, users: list[UserSchema]) -> None:
+            nonlocal next_checkpoint, failure
+            try:
+                await process(users)
+            except Exception as e:
+                failure = failure or e
+                self.logger.error(f"Failed to process chunk starting at {users[0].user_id}: {e}")
+                return
+            finally:
+                semaphore.release()
+            in_flight[sequence] = (users[-1].user_id, True)
+            while next_checkpoint in in_flight and in_flight[next_checkpoint][1]:
+                last_user_id, _ = in_flight.pop(next_checkpoint)
+                next_checkpoint += 1
+                if on_checkpoint:
+                    on_checkpoint(last_user_id)
+
+        sequence = 0
+        async with aclosing(self.profiles_pg_repository.stream_users(after_user_id, chunk_size)) as chunks:
+            async for users in chunks:
+                await semaphore.acquire()
+                if failure:
+                    semaphore.release()
+                    break
+                in_flight[sequence] = (users[-1].user_id, False)
+                task = asyncio.create_task(run(sequence, users))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sequence += 1
+        if tasks:
+            await asyncio.gather(*tasks)
+        if failure:
+            raise failure
+
+    def _log_rejected(self, rejected_users: dict[str, str]) -> None:
+        for user_id, error in rejected_users.items():
+            self.logger.error(f"Document of user {user_id} rejected by Elasticsearch: {error}")
+
+    @staticmethod
+    def _read_checkpoint(checkpoint_path: Optional[str]) -> Optional[uuid.UUID]:
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path) as checkpoint_file:
+            return uuid.UUID(json.load(checkpoint_file)["after_user_id"])
+
+    @staticmethod
+    def _write_checkpoint(checkpoint_path: Optional[str], user_id: uuid.UUID) -> None:
+        if not checkpoint_path:
+            return
+        # Запись через временный файл, чтобы прерванный процесс не оставил битый чекпоинт.
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w") as checkpoint_file:
+            json.dump({"after_user_id": str(user_id)}, checkpoint_file)
+        os.replace(tmp_path, checkpoint_path)
+
+
+def get_elastic_sync_service() -> ElasticSyncService:
+    return ElasticSyncService(
+        profiles_pg_repository=get_profiles_pg_repository(),
+        profiles_elastic_repository=get_profiles_es_repository(),
+        logger=get_logger(),
+    )
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+
+from app.configs.main import settings
+from app.interfaces.repositories import (
+    ProfileQueuesRedisRepositoryInterface,
+    ProfilesElasticRepositoryInterface,
+    ProfilesPostgresRepositoryInterface,
+)
+from app.logger import get_logger
+from app.repositories.profiles_es import get_profiles_es_repository
+from app.repositories.profiles_pg import get_profiles_pg_repository
+from app.repositories.profiles_redis import get_profile_queues_redis_repository
+from app.schemas.users import UserSchema
+from app.services.ranking import CandidatesRanker, get_candidates_ranker
+
+
+class FeedPrecomputeService:
+    """Прогрев очередей до пиковых часов: пачки пользователей из PG, кандидаты одним _msearch на пачку."""
+
+    def __init__(
+            self,
+            profiles_pg_repository: ProfilesPostgresRepositoryInterface,
+            profiles_elastic_repository: ProfilesElasticRepositoryInterface,
+            profile_queues_redis_repository: ProfileQueuesRedisRepositoryInterface,
+            candidates_ranker: CandidatesRanker,
+            logger: logging.Logger,
+    ):
+        self.profiles_pg_repository = profiles_pg_repository
+        self.profiles_elastic_repository = profiles_elastic_repository
+        self.profile_queues_redis_repository = profile_queues_redis_repository
+        self.candidates_ranker = candidates_ranker
+        self.logger = logger
+
+    async def run(self, batch_size: int, concurrency: int, rate: float, min_queue_length: int) -> int:
+        """
+        Обходит пользователей пачками по batch_size, держит в работе не более concurrency пачек
+        и запускает не более rate пачек в секунду (0 — без ограничения). Возвращает число прогретых очередей.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = set()
+        warmed_queues = 0
+        after_user_id: Optional[uuid.UUID] = None
+        next_start = time.monotonic()
+
+        async def process(users: list[UserSchema]) -> None:
+            nonlocal warmed_queues
+            try:
+                warmed_queues += await self.process_batch(users, min_queue_length)
+            except Exception as e:
+                self.logger.error(f"Failed to precompute feeds for batch starting at {users[0].user_id}: {e}")
+            finally:
+                semaphore.release()
+
+        while True:
+            users = await self.profiles_pg_repository.get_feed_users_batch(after_user_id, batch_size)
+            if not users:
+                break
+            after_user_id = users[-1].user_id
+            if rate > 0:
+                await asyncio.sleep(max(next_start - time.monotonic(), 0))
+                next_start = max(next_start, time.monotonic()) + 1 / rate
+            await semaphore.acquire()
+            task = asyncio.create_task(process(users))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        return warmed_queues
+
+    async def process_batch(self, users: list[UserSchema], min_queue_length: int) -> int:
+        user_ids = [str(user.user_id) for user in users]
+        queues = await self.profile_queues_redis_repository.get_users_queues(user_ids)
+        users = [user for user in users if len(queues[str(user.user_id)]) < min_queue_length]
+        if not users:
+            return 0
+        seen = await self.profile_queues_redis_repository.get_seen_users_many([str(user.user_id) for user in users])
+        exclude_ids = {
+            str(user.user_id): queues[str(user.user_id)] + seen[str(user.user_id)]
+            for user in users
+        }
+        candidates = await self.profiles_elastic_repository.get_users_queues(users, exclude_ids)
+        ranked_queues = {
+            str(user.user_id): self.candidates_ranker.rank(
+                user, candidates[str(user.user_id)], settings.feed.FEED_BATCH_SIZE
+            )
+            for user in users if str(user.user_id) in candidates
+        }
+        await self.profile_queues_redis_repository.add_to_queues(ranked_queues)
+        self.logger.info(f"Precomputed {len(ranked_queues)} feeds up to user {users[-1].user_id}")
+        return len(ranked_queues)
+
+
+def get_feed_precompute_service() -> FeedPrecomputeService:
+    return FeedPrecomputeService(
+        profiles_pg_repository=get_profiles_pg_repository(),
+        profiles_elastic_repository=get_profiles_es_repository(),
+        profile_queues_redis_repository=get_profile_queues_redis_repository(),
+        candidates_ranker=get_candidates_ranker(),
+        logger=get_logger(),
+    )
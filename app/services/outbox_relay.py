@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.brokers.producer import get_kafka_producer
+from app.configs.main import settings
+from app.interfaces.brokers import KafkaProducerInterface
+from app.interfaces.repositories import ProfilesElasticRepositoryInterface, ProfilesPostgresRepositoryInterface
+from app.logger import get_logger
+from app.models.outbox import OutboxEventTypeEnum
+from app.repositories.profiles_es import get_profiles_es_repository
+from app.repositories.profiles_pg import get_profiles_pg_repository
+from app.schemas.outbox import OutboxEventSchema
+from app.schemas.users import UserSchema
+
+FLUSH_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 5000)
+
+
+class FlushMetrics:
+    """Отправки пачек одной стороне: число, ошибки и гистограмма длительности по FLUSH_BUCKETS_MS."""
+
+    def __init__(self):
+        self.flushes = 0
+        self.failed = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.buckets = [0] * (len(FLUSH_BUCKETS_MS) + 1)
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.observe((time.perf_counter() - started_at) * 1000)
+
+    def observe(self, flush_ms: float) -> None:
+        self.flushes += 1
+        self.last_flush_ms = flush_ms
+        self.max_flush_ms = max(self.max_flush_ms, flush_ms)
+        self.total_flush_ms += flush_ms
+        self.buckets[next(
+            (i for i, bound in enumerate(FLUSH_BUCKETS_MS) if flush_ms <= bound), len(FLUSH_BUCKETS_MS)
+        )] += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "failed": self.failed,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            "flush_ms_buckets": {
+                **{f"le_{bound}": count for bound, count in zip(FLUSH_BUCKETS_MS, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+class OutboxRelayMetrics:
+    def __init__(self):
+        self.relayed = 0
+        self.pending = 0
+        self.oldest_event_age_seconds = 0.0
+        self.backlog_checked_at = 0.0
+        self.kafka = FlushMetrics()
+        self.elastic = FlushMetrics()
+
+
+outbox_metrics = OutboxRelayMetrics()
+
+
+class OutboxRelayService:
+    """Доставка событий из outbox: лайки и мэтчи в Kafka, изменения анкет в Elasticsearch, пачками."""
+
+    def __init__(
+            self,
+            profiles_pg_repository: ProfilesPostgresRepositoryInterface,
+            profiles_elastic_repository: ProfilesElasticRepositoryInterface,
+            kafka_producer: KafkaProducerInterface,
+            logger: logging.Logger,
+            batch_size: int,
+            poll_interval_ms: int,
+            stats_interval_ms: int = settings.outbox.OUTBOX_STATS_INTERVAL_MS,
+    ):
+        self.profiles_pg_repository = profiles_pg_repository
+        self.profiles_elastic_repository = profiles_elastic_repository
+        self.kafka_producer = kafka_producer
+        self.logger = logger
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_ms / 1000
+        self.stats_interval = stats_interval_ms / 1000
+
+    async def run(self) -> None:
+        """Полная пачка разбирается сразу следующей, иначе ждём poll_interval."""
+        while True:
+            try:
+                relayed = await self.relay_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Failed to relay outbox events: {e}")
+                relayed = 0
+            await self.refresh_backlog_stats()
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def relay_batch(self) -> int:
+        """
+        События удаляются из outbox только после подтверждения Kafka и Elasticsearch. Если не ответила одна
+        сторона, в outbox остаются только её события: доставленное в другую повторно не отправляется.
+        Возвращает число удалённых событий.
+        """
+        async with self.profiles_pg_repository.lock_outbox_events(self.batch_size) as events:
+            if not events:
+                return 0
+            kafka_error, elastic_error = await asyncio.gather(
+                self._send_to_kafka(events),
+                self._send_to_elastic(events),
+                return_exceptions=True,
+            )
+            retained_types = set()
+            if kafka_error:
+                self.logger.error(f"Failed to relay outbox events to Kafka: {kafka_error}")
+                retained_types.update(self._get_topics())
+            if elastic_error:
+                self.logger.error(f"Failed to relay outbox events to Elasticsearch: {elastic_error}")
+                retained_types.add(OutboxEventTypeEnum.user_updated)
+            # Из outbox удаляются события, оставшиеся в списке к выходу из контекста.
+            events[:] = [event for event in events if event.event_type not in retained_types]
+        outbox_metrics.relayed += len(events)
+        return len(events)
+
+    async def refresh_backlog_stats(self) -> None:
+        """Очередь outbox пересчитывается не чаще stats_interval: это count по всей таблице."""
+        if time.monotonic() - outbox_metrics.backlog_checked_at < self.stats_interval:
+            return
+        outbox_metrics.backlog_checked_at = time.monotonic()
+        try:
+            backlog = await self.profiles_pg_repository.get_outbox_backlog()
+        except Exception as e:
+            self.logger.warning(f"Failed to read outbox backlog: {e}")
+            return
+        outbox_metrics.pending = backlog.pending
+        outbox_metrics.oldest_event_age_seconds = backlog.oldest_age_seconds
+
+    async def _send_to_kafka(self, events: list[OutboxEventSchema]) -> None:
+        topics = self._get_topics()
+        messages = [
+            (topics[event.event_type], event.payload, event.partition_key)
+            for event in events if event.event_type in topics
+        ]
+        if messages:
+            with outbox_metrics.kafka.measure():
+                await self.kafka_producer.send_messages(messages)
+
+    async def _send_to_elastic(self, events: list[OutboxEventSchema]) -> None:
+        # Из нескольких изменений одной анкеты в пачке достаточно последнего.
+        users = {
+            event.payload["user_id"]: UserSchema.model_validate(event.payload)
+            for event in events if event.event_type == OutboxEventTypeEnum.user_updated
+        }
+        if not users:
+            return
+        with outbox_metrics.elastic.measure():
+            rejected_users = await self.profiles_elastic_repository.index_users_documents(list(users.values()))
+        # Отклонённый насовсем документ не пройдёт и при повторе: событие удаляется, чтобы не держать очередь,
+        # а payload пишется в лог для ручного разбора.
+        for user_id, error in rejected_users.items():
+            self.logger.error(f"Outbox event for user {user_id} dropped, Elasticsearch rejected the document: "
+                              f"{error} | Payload: {users[user_id].model_dump(mode='json')}")
+
+    def _get_topics(self) -> dict[OutboxEventTypeEnum, str]:
+        return {
+            OutboxEventTypeEnum.like_created: self.kafka_producer.likes_topic,
+            OutboxEventTypeEnum.match_created: self.kafka_producer.matches_topic,
+        }
+
+
+def get_outbox_relay_stats() -> dict:
+    return {
+        "relayed": outbox_metrics.relayed,
+        "pending": outbox_metrics.pending,
+        "oldest_event_age_seconds": round(outbox_metrics.oldest_event_age_seconds, 2),
+        "kafka": outbox_metrics.kafka.get_stats(),
+        "elasticsearch": outbox_metrics.elastic.get_stats(),
+    }
+
+
+def get_outbox_relay_service() -> OutboxRelayService:
+    return OutboxRelayService(
+        profiles_pg_repository=get_profiles_pg_repository(),
+        profiles_elastic_repository=get_profiles_es_repository(),
+        kafka_producer=get_kafka_producer(),
+        logger=get_logger(),
+        batch_size=settings.outbox.OUTBOX_BATCH_SIZE,
+        poll_interval_ms=settings.outbox.OUTBOX_POLL_INTERVAL_MS,
+    )
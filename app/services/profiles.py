@@ -2,50 +2,65 @@ import asyncio
 import hashlib
 import hmac
 import logging
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Union
 
 import jwt
 from fastapi import UploadFile
+from redis.exceptions import RedisError
 
-from app.brokers.producer import get_kafka_producer
 from app.configs.main import settings
-from app.filters.base import BaseFilter
-from app.interfaces.brokers import KafkaProducerInterface
+from app.exceptions.profiles import FeedRefillingException
+from app.filters.likes import LikesFilter
 from app.interfaces.repositories import (
     ProfileQueuesRedisRepositoryInterface,
+    ProfilesCacheRedisRepositoryInterface,
     ProfilesElasticRepositoryInterface,
+    ProfilesLocalCacheInterface,
     ProfilesPostgresRepositoryInterface,
     ProfilesS3RepositoryInterface,
 )
 from app.interfaces.services import ProfilesServiceInterface
 from app.logger import get_logger
 from app.models.likes import LikeStatusEnum
+from app.repositories.profiles_cache import get_profiles_cache_redis_repository
 from app.repositories.profiles_es import get_profiles_es_repository
+from app.repositories.profiles_local_cache import get_profiles_local_cache
 from app.repositories.profiles_pg import get_profiles_pg_repository
 from app.repositories.profiles_redis import get_profile_queues_redis_repository
 from app.repositories.profiles_s3 import get_profiles_s3_repository
-from app.schemas.likes import LikeCreateSchema, LikeSchema
-from app.schemas.matches import MatchCreateSchema
+from app.schemas.feed import FeedCursorSchema, FeedPageSchema, RefillLeaseEnum
+from app.schemas.likes import LikeCreateSchema, LikeSchema, LikesPageSchema, SkipCreateSchema
+from app.schemas.matches import MatchCreateSchema, MatchSchema
 from app.schemas.users import TelegramUserInSchema, UserSchema, UserUpdatePhotoSchema, UserUpdateSchema
+from app.services.ranking import CandidatesRanker, get_candidates_ranker
 
 
 class ProfilesService(ProfilesServiceInterface):
+    # Цикл событий держит задачи только слабыми ссылками. Сервис создаётся на каждый запрос, поэтому
+    # фоновые пополнения хранятся на классе до завершения, иначе задачу может собрать GC вместе с арендой.
+    background_tasks: set[asyncio.Task] = set()
+
     def __init__(
             self,
             profiles_pg_repository: ProfilesPostgresRepositoryInterface,
             profiles_elastic_repository: ProfilesElasticRepositoryInterface,
             profiles_s3_repository: ProfilesS3RepositoryInterface,
             profile_queues_redis_repository: ProfileQueuesRedisRepositoryInterface,
-            kafka_producer: KafkaProducerInterface,
+            profiles_cache_redis_repository: ProfilesCacheRedisRepositoryInterface,
+            profiles_local_cache: ProfilesLocalCacheInterface,
+            candidates_ranker: CandidatesRanker,
             logger: logging.Logger,
     ):
         self.profiles_pg_repository = profiles_pg_repository
         self.profiles_elastic_repository = profiles_elastic_repository
         self.profiles_s3_repository = profiles_s3_repository
         self.profile_queues_redis_repository = profile_queues_redis_repository
-        self.kafka_producer = kafka_producer
+        self.profiles_cache_redis_repository = profiles_cache_redis_repository
+        self.profiles_local_cache = profiles_local_cache
+        self.candidates_ranker = candidates_ranker
         self.logger = logger
 
     @staticmethod
@@ -71,44 +86,75 @@ class ProfilesService(ProfilesServiceInterface):
         access_token = jwt.encode(payload, settings.secret.JWT_SECRET, algorithm=settings.secret.ALGORITHM)
         return access_token
 
-    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[UserSchema]:
-        user = await self.profiles_pg_repository.get_user_by_telegram_id(telegram_id)
-        return user
-
     async def get_user_by_id(self, user_id: uuid.UUID) -> Optional[UserSchema]:
+        user = self.profiles_local_cache.get_user(user_id)
+        if user:
+            return user
+        user = await self.profiles_cache_redis_repository.get_user(user_id)
+        if user:
+            self.profiles_local_cache.set_user(user)
+            return user
         user = await self.profiles_pg_repository.get_user_by_id(user_id)
+        if user:
+            await self.profiles_cache_redis_repository.set_user(user)
+            self.profiles_local_cache.set_user(user)
         return user
 
+    async def get_users_by_ids(self, user_ids: list[uuid.UUID]) -> list[UserSchema]:
+        users = self.profiles_local_cache.get_users(user_ids)
+        missing_user_ids = [user_id for user_id in user_ids if user_id not in users]
+        if missing_user_ids:
+            cached_users = await self.profiles_cache_redis_repository.get_users(missing_user_ids)
+            self.profiles_local_cache.set_users(list(cached_users.values()))
+            users.update(cached_users)
+            missing_user_ids = [user_id for user_id in missing_user_ids if user_id not in users]
+        if missing_user_ids:
+            loaded_users = await self.profiles_pg_repository.get_users_by_ids(missing_user_ids)
+            await self.profiles_cache_redis_repository.set_users(loaded_users)
+            self.profiles_local_cache.set_users(loaded_users)
+            users.update({user.user_id: user for user in loaded_users})
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
     async def update_user_info(
             self, user_id: uuid.UUID, user_data: Union[UserUpdateSchema, UserUpdatePhotoSchema]
     ) -> Optional[UserSchema]:
         user = await self.profiles_pg_repository.update_user_info(user_id, user_data)
-        _ = asyncio.create_task(self.update_user_document(user))
+        if user:
+            await self.profiles_cache_redis_repository.set_user(user)
+            self.profiles_local_cache.invalidate(user_id)
+            try:
+                await self.profiles_cache_redis_repository.publish_invalidation(user_id)
+            except RedisError as e:
+                # Профиль уже сохранён; L1 других воркеров догонит его по TTL.
+                self.logger.warning(f"Failed to publish cache invalidation for user {user_id}: {e}")
         return user
 
-    async def create_user_with_telegram_user_data(self, user_data: TelegramUserInSchema) -> UserSchema:
-        user = await self.profiles_pg_repository.create_user_with_telegram_user_data(user_data)
-        _ = asyncio.create_task(self.update_user_document(user))
+    async def login_telegram_user(self, user_data: TelegramUserInSchema) -> UserSchema:
+        user, created = await self.profiles_pg_repository.upsert_user_by_telegram_id(user_data)
+        if created:
+            await self.profiles_cache_redis_repository.set_user(user)
         return user
 
     async def create_like(self, user_id: uuid.UUID, like_data: LikeCreateSchema) -> LikeSchema:
         like = await self.profiles_pg_repository.create_like(user_id, like_data)
-        await self.kafka_producer.sent_message(self.kafka_producer.likes_topic, like.dict())
-        self.logger.info(f"Message sent to Kafka topic {self.kafka_producer.likes_topic}: {like.dict()}")
+        await self._add_to_seen(user_id, like_data.liked_user_id)
         return like
 
-    async def get_my_likes(self, user_id: uuid.UUID, filters: BaseFilter) -> list[LikeSchema]:
+    async def skip_user(self, user_id: uuid.UUID, skip_data: SkipCreateSchema) -> None:
+        await self._add_to_seen(user_id, skip_data.skipped_user_id)
+
+    async def _add_to_seen(self, user_id: uuid.UUID, target_user_id: uuid.UUID) -> None:
+        """
+        Просмотренные только фильтруют ленту: лайк к этому моменту уже сохранён, и ошибка Redis не должна
+        превращать ответ в 500, на повторе которого клиент получит LikeExists.
+        """
+        try:
+            await self.profile_queues_redis_repository.add_to_seen(str(user_id), str(target_user_id))
+        except RedisError as e:
+            self.logger.warning(f"Failed to mark user {target_user_id} as seen by {user_id}: {e}")
+
+    async def get_my_likes(self, user_id: uuid.UUID, filters: LikesFilter) -> LikesPageSchema:
         likes = await self.profiles_pg_repository.get_my_likes(user_id, filters)
-        tasks = [
-            asyncio.create_task(self.profiles_pg_repository.update_like_status(like.like_id, LikeStatusEnum.seen))
-            for like in likes if like.status == LikeStatusEnum.new
-        ]
-        if tasks:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    like_id = likes[i].id
-                    self.logger.error(f"Ошибка при обновлении лайка с ID {like_id}: {result}")
         return likes
 
     async def check_mutual_like(self, user_id: uuid.UUID, liked_user_id: uuid.UUID) -> Optional[LikeSchema]:
@@ -121,27 +167,104 @@ class ProfilesService(ProfilesServiceInterface):
 
     async def create_match(self, match_data: MatchCreateSchema) -> None:
         match = await self.profiles_pg_repository.create_match(match_data)
-        await self.kafka_producer.sent_message(self.kafka_producer.matches_topic, match.dict())
-        self.logger.info(f"Message sent to Kafka topic {self.kafka_producer.matches_topic}: {match.dict()}")
         return match
 
-    async def update_user_document(self, user: UserSchema) -> None:
-        await self.profiles_elastic_repository.update_user_document(user)
-        self.logger.info(f"User data with ID {user.user_id} successfully updated in Elasticsearch.")
+    async def resolve_mutual_like(self, user_id: uuid.UUID, liked_user_id: uuid.UUID) -> Optional[MatchSchema]:
+        match = await self.profiles_pg_repository.resolve_mutual_like(user_id, liked_user_id)
+        return match
+
+    async def resolve_mutual_likes(self, pairs: list[tuple[uuid.UUID, uuid.UUID]]) -> list[MatchSchema]:
+        matches = await self.profiles_pg_repository.resolve_mutual_likes(pairs)
+        return matches
+
+    async def get_user_for_action(self, user_id: uuid.UUID) -> Optional[uuid.UUID]:
+        users_for_action = await self.get_users_for_action(user_id, 1)
+        return users_for_action[0] if users_for_action else None
 
-    async def get_user_for_action(self, user_id: uuid.UUID) -> Optional[UserSchema]:
-        user_for_action = await self.profile_queues_redis_repository.pop_from_queue(user_id)
-        return user_for_action
+    async def get_users_for_action(self, user_id: uuid.UUID, count: int) -> list[uuid.UUID]:
+        """
+        Снимает до count id из очереди. Пополняет очередь только получивший аренду: в фоне, если очередь
+        просто ниже low-watermark, и синхронно, если она пуста. Остальные недолго ждут чужое пополнение.
+        """
+        lease_token = uuid.uuid4().hex
+        low_watermark = settings.feed.FEED_LOW_WATERMARK if settings.feed.FEED_PREFETCH else 0
+        deadline = time.monotonic() + settings.feed.FEED_REFILL_WAIT_MS / 1000
+        while True:
+            queue_pop = await self.profile_queues_redis_repository.pop_from_queue_with_lease(
+                str(user_id), count, lease_token, low_watermark
+            )
+            if queue_pop.lease == RefillLeaseEnum.acquired:
+                if queue_pop.user_ids:
+                    task = asyncio.create_task(self._refill_users_queue_in_background(user_id, lease_token))
+                    self.background_tasks.add(task)
+                    task.add_done_callback(self.background_tasks.discard)
+                    break
+                await self.refill_users_queue(user_id, lease_token)
+                queue_pop = await self.profile_queues_redis_repository.pop_from_queue_with_lease(
+                    str(user_id), count, lease_token, low_watermark, acquire_lease=False
+                )
+                break
+            if queue_pop.user_ids or queue_pop.lease != RefillLeaseEnum.busy:
+                break
+            if time.monotonic() >= deadline:
+                raise FeedRefillingException
+            await asyncio.sleep(settings.feed.FEED_REFILL_POLL_INTERVAL_MS / 1000)
+        return [uuid.UUID(target_user_id) for target_user_id in queue_pop.user_ids]
 
     async def add_users_queue(self, user: UserSchema) -> None:
-        users_ids_queue = await self._get_users_queue(user)
-        await self.profile_queues_redis_repository.add_to_queue(str(user.user_id), users_ids_queue)
+        """
+        Ранжирует пул из FEED_RANKING_POOL_SIZE кандидатов и ставит в очередь лучшие FEED_BATCH_SIZE.
+        Остаток пула сохраняется до следующего пополнения, из Elasticsearch добирается только
+        недостающее, поэтому курсор не проскакивает кандидатов, которых никто не показал.
+        """
+        user_id = str(user.user_id)
+        queued_ids = await self.profile_queues_redis_repository.get_users_queue(user_id)
+        seen_ids = await self.profile_queues_redis_repository.get_seen_users(user_id)
+        cursor = await self.profile_queues_redis_repository.get_feed_cursor(user_id)
+        exclude_ids = set(queued_ids) | set(seen_ids)
+        pool = [
+            candidate for candidate in await self.profile_queues_redis_repository.get_feed_pool(user_id)
+            if candidate["user_id"] not in exclude_ids
+        ]
+        if len(pool) < settings.feed.FEED_RANKING_POOL_SIZE:
+            feed_page = await self._get_users_queue(
+                user,
+                [*exclude_ids, *(candidate["user_id"] for candidate in pool)],
+                cursor,
+                settings.feed.FEED_RANKING_POOL_SIZE - len(pool),
+            )
+            pool.extend(feed_page.candidates)
+            await self.profile_queues_redis_repository.set_feed_cursor(user_id, feed_page.cursor)
+        ranked_user_ids = self.candidates_ranker.rank(user, pool, len(pool))
+        queue_ids = ranked_user_ids[:settings.feed.FEED_BATCH_SIZE]
+        candidates = {candidate["user_id"]: candidate for candidate in pool}
+        await self.profile_queues_redis_repository.add_to_queue(user_id, queue_ids)
+        await self.profile_queues_redis_repository.set_feed_pool(
+            user_id, [candidates[candidate_id] for candidate_id in ranked_user_ids[settings.feed.FEED_BATCH_SIZE:]]
+        )
+
+    async def refill_users_queue(self, user_id: uuid.UUID, lease_token: str) -> None:
+        """Пополнение очереди владельцем аренды; аренда освобождается в любом случае."""
+        try:
+            user = await self.get_user_by_id(user_id)
+            if user:
+                await self.add_users_queue(user)
+        finally:
+            await self.profile_queues_redis_repository.release_refill_lease(str(user_id), lease_token)
+
+    async def _refill_users_queue_in_background(self, user_id: uuid.UUID, lease_token: str) -> None:
+        try:
+            await self.refill_users_queue(user_id, lease_token)
+        except Exception as e:
+            self.logger.error(f"Failed to refill queue for user {user_id}: {e}")
 
     async def upload_photo(self, user_uuid: uuid.UUID, file: UploadFile) -> str:
         return await self.profiles_s3_repository.upload_file(file, user_uuid)
 
-    async def _get_users_queue(self, user: UserSchema) -> list[str]:
-        return await self.profiles_elastic_repository.get_users_queue(user)
+    async def _get_users_queue(
+            self, user: UserSchema, exclude_ids: list[str], cursor: Optional[FeedCursorSchema], size: int
+    ) -> FeedPageSchema:
+        return await self.profiles_elastic_repository.get_users_queue(user, exclude_ids, cursor, size)
 
 
 def get_profiles_service() -> ProfilesService:
@@ -149,7 +272,9 @@ def get_profiles_service() -> ProfilesService:
     profiles_elastic_repository = get_profiles_es_repository()
     profiles_s3_repository = get_profiles_s3_repository()
     profile_queues_redis_repository = get_profile_queues_redis_repository()
-    kafka_producer = get_kafka_producer()
+    profiles_cache_redis_repository = get_profiles_cache_redis_repository()
+    profiles_local_cache = get_profiles_local_cache()
+    candidates_ranker = get_candidates_ranker()
     logger = get_logger()
 
     return ProfilesService(
@@ -157,6 +282,8 @@ def get_profiles_service() -> ProfilesService:
         profiles_elastic_repository=profiles_elastic_repository,
         profiles_s3_repository=profiles_s3_repository,
         profile_queues_redis_repository=profile_queues_redis_repository,
-        kafka_producer=kafka_producer,
+        profiles_cache_redis_repository=profiles_cache_redis_repository,
+        profiles_local_cache=profiles_local_cache,
+        candidates_ranker=candidates_ranker,
         logger=logger,
     )
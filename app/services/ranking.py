@@ -0,0 +1,108 @@
+import time
+from itertools import chain, repeat
+
+import numpy as np
+
+from app.configs.main import settings
+from app.schemas.users import UserSchema
+
+MAX_USER_INTERESTS = 64
+
+
+class CandidatesRanker:
+    """
+    Ранжирование пула кандидатов одним векторизованным проходом NumPy.
+
+    Интересы кандидата кодируются битовой маской по интересам пользователя (до 64 штук, uint64),
+    пересечение считается popcount'ом, объединение как |A| + |B| - |A ∩ B|.
+    """
+
+    def __init__(
+            self,
+            interests_weight: float,
+            age_weight: float,
+            recency_weight: float,
+            distance_weight: float,
+            age_scale: float,
+            recency_half_life: float,
+            distance_scale: float,
+    ):
+        self.interests_weight = interests_weight
+        self.age_weight = age_weight
+        self.recency_weight = recency_weight
+        self.distance_weight = distance_weight
+        self.age_scale = age_scale
+        self.recency_half_life = recency_half_life
+        self.distance_scale = distance_scale
+
+    def rank(self, user: UserSchema, candidates: list[dict], top_k: int) -> list[str]:
+        if not candidates or top_k <= 0:
+            return []
+        scores = (
+            self.interests_weight * self._get_interests_scores(user, candidates) +
+            self.age_weight * self._get_age_scores(user, candidates) +
+            self.recency_weight * self._get_recency_scores(candidates) +
+            self.distance_weight * self._get_distance_scores(candidates)
+        )
+        if top_k < len(scores):
+            top_indexes = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top_indexes = np.arange(len(scores))
+        top_indexes = top_indexes[np.argsort(-scores[top_indexes], kind="stable")]
+        return [candidates[index]["user_id"] for index in top_indexes]
+
+    @staticmethod
+    def _get_interests_scores(user: UserSchema, candidates: list[dict]) -> np.ndarray:
+        user_interests = list(dict.fromkeys(user.interests or []))[:MAX_USER_INTERESTS]
+        if not user_interests:
+            return np.zeros(len(candidates))
+        user_bit_indexes = {interest: bit for bit, interest in enumerate(user_interests)}
+        candidate_interests = [candidate.get("interests") or [] for candidate in candidates]
+        lengths = np.fromiter(map(len, candidate_interests), dtype=np.int64, count=len(candidates))
+        flat_interests = list(chain.from_iterable(candidate_interests))
+        bit_indexes = np.fromiter(
+            map(user_bit_indexes.get, flat_interests, repeat(MAX_USER_INTERESTS)),
+            dtype=np.uint64,
+            count=len(flat_interests),
+        )
+        flat_bits = np.zeros(len(flat_interests), dtype=np.uint64)
+        np.left_shift(np.uint64(1), bit_indexes, out=flat_bits, where=bit_indexes < MAX_USER_INTERESTS)
+        masks = np.zeros(len(candidates), dtype=np.uint64)
+        non_empty = lengths > 0
+        if flat_bits.size:
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            masks[non_empty] = np.bitwise_or.reduceat(flat_bits, offsets[non_empty])
+        intersection = np.bitwise_count(masks).astype(np.float64)
+        union = lengths + len(user_interests) - intersection
+        return np.divide(intersection, union, out=np.zeros(len(candidates)), where=union > 0)
+
+    def _get_age_scores(self, user: UserSchema, candidates: list[dict]) -> np.ndarray:
+        if user.age is None:
+            return np.zeros(len(candidates))
+        ages = np.array([candidate.get("age") for candidate in candidates], dtype=np.float64)
+        scores = np.exp(-np.abs(ages - user.age) / self.age_scale)
+        return np.nan_to_num(scores, nan=0.0)
+
+    def _get_recency_scores(self, candidates: list[dict]) -> np.ndarray:
+        updated_at = np.array([candidate.get("updated_at") for candidate in candidates], dtype=np.float64)
+        age_seconds = np.maximum(time.time() - updated_at, 0)
+        scores = np.exp2(-age_seconds / self.recency_half_life)
+        return np.nan_to_num(scores, nan=0.0)
+
+    def _get_distance_scores(self, candidates: list[dict]) -> np.ndarray:
+        """Расстояние в км приходит из geo-сортировки ES; вне geo-режима его нет и вклад нулевой."""
+        distances = np.array([candidate.get("distance") for candidate in candidates], dtype=np.float64)
+        scores = np.exp(-distances / self.distance_scale)
+        return np.nan_to_num(scores, nan=0.0)
+
+
+def get_candidates_ranker() -> CandidatesRanker:
+    return CandidatesRanker(
+        interests_weight=settings.feed.FEED_RANKING_INTERESTS_WEIGHT,
+        age_weight=settings.feed.FEED_RANKING_AGE_WEIGHT,
+        recency_weight=settings.feed.FEED_RANKING_RECENCY_WEIGHT,
+        distance_weight=settings.feed.FEED_RANKING_DISTANCE_WEIGHT,
+        age_scale=settings.feed.FEED_RANKING_AGE_SCALE,
+        recency_half_life=settings.feed.FEED_RANKING_RECENCY_HALF_LIFE,
+        distance_scale=settings.feed.FEED_GEO_RADIUS_KM,
+    )
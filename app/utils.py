@@ -31,3 +31,8 @@ def custom_serializer(obj):
     elif isinstance(obj, enum.Enum):
         return obj.value
     raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def get_pair_key(user_id: uuid.UUID | str, other_user_id: uuid.UUID | str) -> str:
+    """Ключ пары пользователей не зависит от того, кто кого лайкнул."""
+    return ":".join(sorted((str(user_id), str(other_user_id))))
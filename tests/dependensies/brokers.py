@@ -17,4 +17,5 @@ def get_mocked_kafka_producer():
     mock_producer.stop = MagicMock()
     mock_producer.send = MagicMock()
     mock_producer.send_message = AsyncMock()
+    mock_producer.send_messages = AsyncMock()
     return mock_producer
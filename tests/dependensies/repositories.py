@@ -1,6 +1,7 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from app.repositories.profiles_pg import ProfilesPostgresRepository
+from app.schemas.feed import QueuePopSchema, RefillLeaseEnum
 from tests.dependensies.database import get_test_session_maker
 
 
@@ -28,4 +29,28 @@ def get_mocked_redis_repository():
     es_repository = MagicMock()
     es_repository.connect = MagicMock()
     es_repository.close = MagicMock()
+    es_repository.add_to_seen = AsyncMock()
+    es_repository.pop_from_queue_with_lease = AsyncMock(return_value=QueuePopSchema(
+        user_ids=["cfb8c340-2ad9-450f-9ef6-c80869e75cf1", "503138d1-c175-401e-bd4f-f3ed543f7abf"],
+        queue_length=100,
+        lease=RefillLeaseEnum.not_requested,
+    ))
     return es_repository
+
+
+def get_mocked_cache_repository():
+    cache_repository = MagicMock()
+    cache_repository.get_user = AsyncMock(return_value=None)
+    cache_repository.get_users = AsyncMock(return_value={})
+    cache_repository.set_user = AsyncMock()
+    cache_repository.set_users = AsyncMock()
+    cache_repository.delete_user = AsyncMock()
+    cache_repository.publish_invalidation = AsyncMock()
+    return cache_repository
+
+
+def get_mocked_local_cache():
+    local_cache = MagicMock()
+    local_cache.get_user = MagicMock(return_value=None)
+    local_cache.get_users = MagicMock(return_value={})
+    return local_cache
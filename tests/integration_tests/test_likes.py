@@ -1,7 +1,16 @@
+import uuid
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
 from starlette import status
 
+from app.models.likes import Likes, LikeStatusEnum
+from app.models.matches import Matches
+from app.schemas.likes import LikeCreateSchema
+from tests.dependensies.database import async_session_maker
+from tests.dependensies.repositories import get_test_profiles_pg_repository
+
 
 @pytest.mark.asyncio
 async def test_like_profile(
@@ -21,3 +30,57 @@ async def test_my_likes(
     response = await authenticated_async_client.get(url="/profile/likes")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_skip_profile(
+        async_client: AsyncClient,
+        authenticated_async_client: AsyncClient,
+):
+    body = {"skipped_user_id": "cfb8c340-2ad9-450f-9ef6-c80869e75cf1"}
+    response = await async_client.post(url="/profile/skip", json=body)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = await authenticated_async_client.post(url="/profile/skip", json=body)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_my_likes_cursor(
+        authenticated_async_client: AsyncClient,
+):
+    response = await authenticated_async_client.get(url="/profile/likes", params={"limit": 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert "X-Next-Cursor" not in response.headers
+    response = await authenticated_async_client.get(url="/profile/likes", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_resolve_mutual_likes():
+    user_id = uuid.UUID("503138d1-c175-401e-bd4f-f3ed543f7abf")
+    other_user_id = uuid.UUID("cfb8c340-2ad9-450f-9ef6-c80869e75cf1")
+    repository = get_test_profiles_pg_repository()
+
+    # Лайк без встречного мэтча не создаёт
+    await repository.create_like(user_id, LikeCreateSchema(liked_user_id=other_user_id))
+    assert await repository.resolve_mutual_likes([(user_id, other_user_id)]) == []
+
+    await repository.create_like(other_user_id, LikeCreateSchema(liked_user_id=user_id))
+    # Встречные сообщения о лайках одной пачкой дают один мэтч
+    matches = await repository.resolve_mutual_likes([(user_id, other_user_id), (other_user_id, user_id)])
+    assert len(matches) == 1
+    assert {matches[0].user1_id, matches[0].user2_id} == {user_id, other_user_id}
+    # Повторная обработка уже созданный мэтч не дублирует
+    assert await repository.resolve_mutual_likes([(other_user_id, user_id)]) == []
+
+    async with async_session_maker() as session:
+        matches_count = len((await session.execute(
+            select(Matches).where(Matches.user1_id.in_([user_id, other_user_id]))
+            .where(Matches.user2_id.in_([user_id, other_user_id]))
+        )).scalars().all())
+        likes_statuses = (await session.execute(
+            select(Likes.status).where(Likes.user_id.in_([user_id, other_user_id]))
+            .where(Likes.liked_user_id.in_([user_id, other_user_id]))
+        )).scalars().all()
+    assert matches_count == 1
+    assert likes_statuses == [LikeStatusEnum.match, LikeStatusEnum.match]
@@ -30,3 +30,18 @@ async def test_update_me(
     response = await authenticated_async_client.put(url="/profile/me", json=body)
     assert response.status_code == status.HTTP_200_OK
     assert response.json().get("name") == "David"
+    body = {"age": 99999}
+    response = await authenticated_async_client.put(url="/profile/me", json=body)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_get_feed(
+        async_client: AsyncClient,
+        authenticated_async_client: AsyncClient,
+):
+    response = await async_client.get(url="/profile/feed", params={"count": 2})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = await authenticated_async_client.get(url="/profile/feed", params={"count": 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert [user.get("name") for user in response.json()] == ["Charlie", "Bob"]
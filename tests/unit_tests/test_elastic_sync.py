@@ -0,0 +1,51 @@
+import asyncio
+import uuid
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.schemas.users import UserSchema
+from app.services.elastic_sync import ElasticSyncService
+
+
+def get_users(count: int) -> list[UserSchema]:
+    user_ids = sorted(uuid.uuid4() for _ in range(count))
+    return [UserSchema(user_id=user_id, telegram_id=1, name="User") for user_id in user_ids]
+
+
+def get_pg_repository(users: list[UserSchema]) -> MagicMock:
+    async def stream_users(after_user_id: Optional[uuid.UUID], chunk_size: int):
+        rest = [user for user in users if after_user_id is None or user.user_id > after_user_id]
+        for i in range(0, len(rest), chunk_size):
+            yield rest[i:i + chunk_size]
+
+    pg_repository = MagicMock()
+    pg_repository.stream_users = stream_users
+    return pg_repository
+
+
+async def test_backfill_resumes_from_checkpoint(tmp_path):
+    users = get_users(10)
+    checkpoint_path = str(tmp_path / "backfill.checkpoint")
+    es_repository = MagicMock()
+
+    async def index_users_documents(chunk: list[UserSchema]) -> dict[str, str]:
+        # Пачки завершаются не по порядку, чекпоинт всё равно не должен перепрыгнуть упавшую
+        await asyncio.sleep(0.01 if chunk[0] == users[0] else 0)
+        if chunk[0] == users[4]:
+            raise RuntimeError("bulk rejected")
+        return {}
+
+    es_repository.index_users_documents = AsyncMock(side_effect=index_users_documents)
+    service = ElasticSyncService(get_pg_repository(users), es_repository, MagicMock())
+
+    with pytest.raises(RuntimeError):
+        await service.backfill(chunk_size=2, concurrency=3, checkpoint_path=checkpoint_path)
+    assert service._read_checkpoint(checkpoint_path) == users[3].user_id
+
+    es_repository.index_users_documents = AsyncMock(return_value={})
+    indexed = await service.backfill(chunk_size=2, concurrency=3, checkpoint_path=checkpoint_path)
+    assert indexed == 6
+    assert es_repository.index_users_documents.await_args_list[0].args[0] == users[4:6]
+    assert service._read_checkpoint(checkpoint_path) is None
@@ -0,0 +1,140 @@
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.configs.main import settings
+from app.exceptions.profiles import FeedRefillingException
+from app.schemas.feed import FeedPageSchema, QueuePopSchema, RefillLeaseEnum
+from app.schemas.users import UserSchema
+from app.services.profiles import ProfilesService
+from app.services.ranking import get_candidates_ranker
+
+user = UserSchema(user_id=uuid.uuid4(), telegram_id=1, name="Alice", age=30, interests=["music"])
+
+
+def get_candidate(user_id: str, age: int) -> dict:
+    return {"user_id": user_id, "interests": ["music"], "age": age, "updated_at": int(time.time())}
+
+
+def get_service(redis_repository: MagicMock, es_repository: MagicMock) -> ProfilesService:
+    return ProfilesService(
+        profiles_pg_repository=MagicMock(),
+        profiles_elastic_repository=es_repository,
+        profiles_s3_repository=MagicMock(),
+        profile_queues_redis_repository=redis_repository,
+        profiles_cache_redis_repository=MagicMock(),
+        profiles_local_cache=MagicMock(),
+        candidates_ranker=get_candidates_ranker(),
+        logger=MagicMock(),
+    )
+
+
+async def test_refill_keeps_unqueued_part_of_ranked_pool(monkeypatch):
+    monkeypatch.setattr(settings.feed, "FEED_RANKING_POOL_SIZE", 4)
+    monkeypatch.setattr(settings.feed, "FEED_BATCH_SIZE", 2)
+    stored_pool = []
+    redis_repository = MagicMock()
+    redis_repository.get_users_queue = AsyncMock(return_value=[])
+    redis_repository.get_seen_users = AsyncMock(return_value=[])
+    redis_repository.get_feed_cursor = AsyncMock(return_value=None)
+    redis_repository.set_feed_cursor = AsyncMock()
+    redis_repository.add_to_queue = AsyncMock()
+
+    async def set_feed_pool(user_id: str, pool: list[dict]) -> None:
+        stored_pool[:] = pool
+
+    redis_repository.get_feed_pool = AsyncMock(side_effect=lambda user_id: list(stored_pool))
+    redis_repository.set_feed_pool = AsyncMock(side_effect=set_feed_pool)
+    es_repository = MagicMock()
+    es_repository.get_users_queue = AsyncMock(side_effect=[
+        FeedPageSchema(candidates=[get_candidate(f"first-{age}", age) for age in (30, 40, 31, 41)]),
+        FeedPageSchema(candidates=[get_candidate(f"second-{age}", age) for age in (30, 50)]),
+    ])
+    service = get_service(redis_repository, es_repository)
+
+    await service.add_users_queue(user)
+    assert redis_repository.add_to_queue.await_args.args[1] == ["first-30", "first-31"]
+    assert [candidate["user_id"] for candidate in stored_pool] == ["first-40", "first-41"]
+
+    # Второе пополнение добирает из Elasticsearch только недостающие до пула кандидаты
+    await service.add_users_queue(user)
+    _, exclude_ids, _, size = es_repository.get_users_queue.await_args.args
+    assert size == 2
+    assert {"first-40", "first-41"} <= set(exclude_ids)
+    assert redis_repository.add_to_queue.await_args.args[1] == ["second-30", "first-40"]
+    assert [candidate["user_id"] for candidate in stored_pool] == ["first-41", "second-50"]
+
+
+def get_queue_pop(user_ids: list[str], lease: RefillLeaseEnum) -> QueuePopSchema:
+    return QueuePopSchema(user_ids=user_ids, queue_length=0, lease=lease)
+
+
+async def test_busy_lease_waits_for_foreign_refill(monkeypatch):
+    monkeypatch.setattr(settings.feed, "FEED_REFILL_POLL_INTERVAL_MS", 1)
+    target_user_id = str(uuid.uuid4())
+    redis_repository = MagicMock()
+    redis_repository.pop_from_queue_with_lease = AsyncMock(side_effect=[
+        get_queue_pop([], RefillLeaseEnum.busy),
+        get_queue_pop([], RefillLeaseEnum.busy),
+        get_queue_pop([target_user_id], RefillLeaseEnum.not_requested),
+    ])
+    service = get_service(redis_repository, MagicMock())
+    service.refill_users_queue = AsyncMock()
+
+    assert await service.get_users_for_action(user.user_id, 1) == [uuid.UUID(target_user_id)]
+    assert redis_repository.pop_from_queue_with_lease.await_count == 3
+    service.refill_users_queue.assert_not_awaited()
+
+
+async def test_busy_lease_raises_after_wait_deadline(monkeypatch):
+    monkeypatch.setattr(settings.feed, "FEED_REFILL_WAIT_MS", 20)
+    monkeypatch.setattr(settings.feed, "FEED_REFILL_POLL_INTERVAL_MS", 5)
+    redis_repository = MagicMock()
+    redis_repository.pop_from_queue_with_lease = AsyncMock(return_value=get_queue_pop([], RefillLeaseEnum.busy))
+    service = get_service(redis_repository, MagicMock())
+    service.refill_users_queue = AsyncMock()
+
+    with pytest.raises(FeedRefillingException):
+        await service.get_users_for_action(user.user_id, 1)
+    assert redis_repository.pop_from_queue_with_lease.await_count > 1
+    service.refill_users_queue.assert_not_awaited()
+
+
+async def test_acquired_lease_on_empty_queue_refills_synchronously():
+    target_user_id = str(uuid.uuid4())
+    redis_repository = MagicMock()
+    redis_repository.pop_from_queue_with_lease = AsyncMock(side_effect=[
+        get_queue_pop([], RefillLeaseEnum.acquired),
+        get_queue_pop([target_user_id], RefillLeaseEnum.not_requested),
+    ])
+    service = get_service(redis_repository, MagicMock())
+    service.refill_users_queue = AsyncMock()
+
+    assert await service.get_users_for_action(user.user_id, 1) == [uuid.UUID(target_user_id)]
+    lease_token = redis_repository.pop_from_queue_with_lease.await_args_list[0].args[2]
+    service.refill_users_queue.assert_awaited_once_with(user.user_id, lease_token)
+    assert redis_repository.pop_from_queue_with_lease.await_args.kwargs == {"acquire_lease": False}
+
+
+async def test_background_refill_is_held_until_done():
+    target_user_id = str(uuid.uuid4())
+    redis_repository = MagicMock()
+    redis_repository.pop_from_queue_with_lease = AsyncMock(
+        return_value=get_queue_pop([target_user_id], RefillLeaseEnum.acquired)
+    )
+    service = get_service(redis_repository, MagicMock())
+    refill_started = asyncio.Event()
+
+    async def refill_users_queue(user_id: uuid.UUID, lease_token: str) -> None:
+        refill_started.set()
+
+    service.refill_users_queue = AsyncMock(side_effect=refill_users_queue)
+
+    assert await service.get_users_for_action(user.user_id, 1) == [uuid.UUID(target_user_id)]
+    [task] = ProfilesService.background_tasks
+    await task
+    assert refill_started.is_set()
+    assert not ProfilesService.background_tasks
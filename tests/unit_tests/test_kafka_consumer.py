@@ -0,0 +1,141 @@
+import json
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from aiokafka import ConsumerRecord, TopicPartition
+from aiokafka.errors import ConsumerStoppedError
+
+from app.brokers.consumer import KafkaConsumer
+
+
+def get_record(offset: int, user_id: uuid.UUID, liked_user_id: uuid.UUID) -> ConsumerRecord:
+    value = json.dumps({"user_id": str(user_id), "liked_user_id": str(liked_user_id)}).encode()
+    return ConsumerRecord("likes", 0, offset, 0, 0, None, value, None, 0, len(value), [])
+
+
+def get_raw_record(offset: int, value: bytes) -> ConsumerRecord:
+    return ConsumerRecord("likes", 0, offset, 0, 0, None, value, None, 0, len(value), [])
+
+
+def get_consumer(profiles_service: MagicMock, batches: list) -> KafkaConsumer:
+    KafkaConsumer._instance = None
+    consumer = KafkaConsumer(
+        "localhost:9092", "profiles", profiles_service, MagicMock(), 1, 1, True, 100, 10, 100
+    )
+    consumer.consumer = MagicMock()
+    consumer.consumer.getmany = AsyncMock(side_effect=[*batches, ConsumerStoppedError()])
+    consumer.consumer.commit = AsyncMock()
+    consumer.consumer.seek = MagicMock()
+    consumer.consumer.assignment = MagicMock(return_value={TopicPartition("likes", 0)})
+    return consumer
+
+
+async def test_batch_is_resolved_in_one_call_and_committed():
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    partition = TopicPartition("likes", 0)
+    profiles_service = MagicMock()
+    profiles_service.resolve_mutual_likes = AsyncMock(return_value=[])
+    consumer = get_consumer(profiles_service, [
+        {partition: [get_record(0, user_id, other_user_id), get_record(1, other_user_id, user_id)]},
+    ])
+
+    await consumer.process_batches()
+
+    profiles_service.resolve_mutual_likes.assert_awaited_once_with([
+        (str(user_id), str(other_user_id)), (str(other_user_id), str(user_id)),
+    ])
+    consumer.consumer.commit.assert_awaited_once()
+    consumer.consumer.seek.assert_not_called()
+
+
+async def test_failed_batch_is_not_committed_and_rewound():
+    partition = TopicPartition("likes", 0)
+    profiles_service = MagicMock()
+    profiles_service.resolve_mutual_likes = AsyncMock(side_effect=ConnectionRefusedError("db is down"))
+    # У новой группы закоммиченного оффсета нет, откат идёт на первое сообщение пачки
+    consumer = get_consumer(profiles_service, [{partition: [
+        get_record(5, uuid.uuid4(), uuid.uuid4()), get_record(6, uuid.uuid4(), uuid.uuid4()),
+    ]}])
+    consumer.consumer.committed = AsyncMock(return_value=None)
+
+    await consumer.process_batches()
+
+    consumer.consumer.commit.assert_not_awaited()
+    consumer.consumer.seek.assert_called_once_with(partition, 5)
+    assert consumer.get_stats()["batch_failures"] == 1
+
+
+async def test_failed_batch_skips_revoked_partitions_and_keeps_consuming():
+    partition = TopicPartition("likes", 0)
+    profiles_service = MagicMock()
+    profiles_service.resolve_mutual_likes = AsyncMock(side_effect=[ConnectionRefusedError("db is down"), []])
+    consumer = get_consumer(profiles_service, [
+        {partition: [get_record(5, uuid.uuid4(), uuid.uuid4())]},
+        {partition: [get_record(5, uuid.uuid4(), uuid.uuid4())]},
+    ])
+    consumer.consumer.assignment.return_value = set()
+
+    await consumer.process_batches()
+
+    consumer.consumer.seek.assert_not_called()
+    assert profiles_service.resolve_mutual_likes.await_count == 2
+
+
+async def test_recent_likes_skip_repeated_like_until_reverse_arrives():
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    partition = TopicPartition("likes", 0)
+    profiles_service = MagicMock()
+    profiles_service.resolve_mutual_likes = AsyncMock(return_value=[])
+    consumer = get_consumer(profiles_service, [
+        {partition: [get_record(0, user_id, other_user_id)]},
+        {partition: [get_record(0, user_id, other_user_id)]},
+        {partition: [get_record(1, other_user_id, user_id)]},
+        {partition: [get_record(2, other_user_id, user_id)]},
+    ])
+
+    await consumer.process_batches()
+
+    # Повтор без встречного лайка и лайк пары, уже ставшей мэтчем, в БД не ходят
+    assert profiles_service.resolve_mutual_likes.await_args_list == [
+        (([(str(user_id), str(other_user_id))],),),
+        (([(str(other_user_id), str(user_id))],),),
+    ]
+    assert consumer.get_stats()["recent_likes"]["hits"] == 2
+
+
+async def test_invalid_messages_are_skipped_and_committed():
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    partition = TopicPartition("likes", 0)
+    profiles_service = MagicMock()
+    profiles_service.resolve_mutual_likes = AsyncMock(return_value=[])
+    consumer = get_consumer(profiles_service, [{partition: [
+        get_raw_record(0, b"not json"),
+        get_raw_record(1, json.dumps({"user_id": str(user_id)}).encode()),
+        get_raw_record(2, json.dumps({"user_id": "42", "liked_user_id": str(user_id)}).encode()),
+        get_record(3, user_id, other_user_id),
+    ]}])
+
+    await consumer.process_batches()
+
+    profiles_service.resolve_mutual_likes.assert_awaited_once_with([(str(user_id), str(other_user_id))])
+    consumer.consumer.commit.assert_awaited_once()
+    consumer.consumer.seek.assert_not_called()
+    assert consumer.get_stats()["skipped"] == 3
+
+
+async def test_permanently_failing_batch_falls_back_to_single_likes():
+    user_id, other_user_id, third_user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    partition = TopicPartition("likes", 0)
+    profiles_service = MagicMock()
+    profiles_service.resolve_mutual_likes = AsyncMock(side_effect=ValueError("bad pair"))
+    profiles_service.resolve_mutual_like = AsyncMock(side_effect=[ValueError("bad pair"), None])
+    consumer = get_consumer(profiles_service, [{partition: [
+        get_record(0, user_id, other_user_id), get_record(1, third_user_id, user_id),
+    ]}])
+
+    await consumer.process_batches()
+
+    assert profiles_service.resolve_mutual_like.await_count == 2
+    consumer.consumer.commit.assert_awaited_once()
+    consumer.consumer.seek.assert_not_called()
+    assert consumer.get_stats()["skipped"] == 1
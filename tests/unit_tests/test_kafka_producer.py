@@ -0,0 +1,43 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import ValidationError
+
+from app.brokers.producer import KafkaProducer
+from app.configs.kafka import KafkaConfig
+
+
+def get_producer(deliveries: list[asyncio.Future]) -> KafkaProducer:
+    KafkaProducer._instance = None
+    producer = KafkaProducer("localhost:9092", MagicMock(), 5, 65536, "gzip", "all", True, "murmur2")
+    producer.producer = MagicMock()
+    producer.producer.send = AsyncMock(side_effect=deliveries)
+    return producer
+
+
+async def test_send_messages_waits_for_delivery_and_records_it():
+    loop = asyncio.get_running_loop()
+    deliveries = [loop.create_future(), loop.create_future()]
+    producer = get_producer(deliveries)
+
+    task = asyncio.create_task(producer.send_messages([("likes", {"like_id": "1"}, "a:b"), ("likes", {}, None)]))
+    await asyncio.sleep(0)
+    assert not task.done()
+    assert producer.get_stats()["in_flight"] == 2
+    assert producer.producer.send.await_args_list[0].kwargs["key"] == b"a:b"
+
+    deliveries[0].set_result(None)
+    deliveries[1].set_exception(RuntimeError("broker unavailable"))
+    with pytest.raises(RuntimeError):
+        await task
+    stats = producer.get_stats()
+    assert (stats["sent"], stats["delivered"], stats["failed"], stats["in_flight"]) == (2, 1, 1, 0)
+
+
+def test_idempotence_requires_acks_all(monkeypatch):
+    monkeypatch.setenv("KAFKA_PRODUCER_ACKS", "1")
+    with pytest.raises(ValidationError):
+        KafkaConfig()
+    monkeypatch.setenv("KAFKA_PRODUCER_IDEMPOTENCE", "false")
+    assert KafkaConfig().KAFKA_PRODUCER_ACKS == 1
@@ -0,0 +1,40 @@
+import uuid
+
+from app.repositories.profiles_local_cache import ProfilesLocalCache
+from app.schemas.users import UserSchema
+
+
+def get_local_cache(**kwargs) -> ProfilesLocalCache:
+    # Обходим синглтон, чтобы тесты не делили состояние
+    cache = object.__new__(ProfilesLocalCache)
+    cache.__init__(**{"ttl": 30, "max_entries": 2, "max_bytes": 1024 * 1024, **kwargs})
+    return cache
+
+
+def get_user(name: str) -> UserSchema:
+    return UserSchema(user_id=uuid.uuid4(), telegram_id=1, name=name)
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = get_local_cache()
+    alice, bob, charlie = get_user("Alice"), get_user("Bob"), get_user("Charlie")
+    cache.set_users([alice, bob])
+    assert cache.get_user(alice.user_id) == alice
+    cache.set_user(charlie)
+    assert cache.get_user(bob.user_id) is None
+    assert cache.get_users([alice.user_id, charlie.user_id]) == {alice.user_id: alice, charlie.user_id: charlie}
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_local_cache_expires_and_invalidates():
+    cache = get_local_cache(ttl=-1)
+    alice = get_user("Alice")
+    cache.set_user(alice)
+    assert cache.get_user(alice.user_id) is None
+    assert cache.get_stats()["expirations"] == 1
+
+    cache = get_local_cache()
+    cache.set_user(alice)
+    cache.invalidate(str(alice.user_id))
+    assert cache.get_user(alice.user_id) is None
+    assert cache.get_stats()["size_bytes"] == 0
@@ -0,0 +1,143 @@
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.outbox import OutboxEventTypeEnum
+from app.schemas.outbox import OutboxBacklogSchema, OutboxEventSchema
+from app.services.outbox_relay import FlushMetrics, OutboxRelayService, get_outbox_relay_stats, outbox_metrics
+
+
+def get_pg_repository(events: list[OutboxEventSchema], committed: list) -> MagicMock:
+    @asynccontextmanager
+    async def lock_outbox_events(limit: int):
+        locked = events[:limit]
+        yield locked
+        # Удаляются события, которые сервис оставил в списке
+        committed.extend(locked)
+
+    pg_repository = MagicMock()
+    pg_repository.lock_outbox_events = lock_outbox_events
+    return pg_repository
+
+
+def get_relay_service(pg_repository: MagicMock, es_repository: MagicMock, kafka_producer: MagicMock):
+    return OutboxRelayService(pg_repository, es_repository, kafka_producer, MagicMock(), 100, 200)
+
+
+def get_event(
+        outbox_id: int, event_type: OutboxEventTypeEnum, payload: dict, partition_key: Optional[str] = None
+) -> OutboxEventSchema:
+    return OutboxEventSchema(
+        outbox_id=outbox_id, event_type=event_type, payload=payload, partition_key=partition_key, created_at=None
+    )
+
+
+def get_kafka_producer() -> MagicMock:
+    kafka_producer = MagicMock(likes_topic="likes", matches_topic="matches")
+    kafka_producer.send_messages = AsyncMock()
+    return kafka_producer
+
+
+async def test_relay_batch_routes_events_and_keeps_last_profile_update():
+    user_id = str(uuid.uuid4())
+    events = [
+        get_event(1, OutboxEventTypeEnum.user_updated, {"user_id": user_id, "telegram_id": 1, "name": "Alice"}),
+        get_event(2, OutboxEventTypeEnum.like_created, {"like_id": "1"}, "a:b"),
+        get_event(3, OutboxEventTypeEnum.user_updated, {"user_id": user_id, "telegram_id": 1, "name": "Alisa"}),
+        get_event(4, OutboxEventTypeEnum.match_created, {"match_id": "1"}, "a:b"),
+    ]
+    committed = []
+    es_repository = MagicMock()
+    es_repository.index_users_documents = AsyncMock(return_value={})
+    kafka_producer = get_kafka_producer()
+    service = get_relay_service(get_pg_repository(events, committed), es_repository, kafka_producer)
+
+    assert await service.relay_batch() == 4
+    kafka_producer.send_messages.assert_awaited_once_with([
+        ("likes", {"like_id": "1"}, "a:b"), ("matches", {"match_id": "1"}, "a:b"),
+    ])
+    [users] = es_repository.index_users_documents.await_args.args
+    assert [user.name for user in users] == ["Alisa"]
+    assert committed == events
+
+
+async def test_relay_batch_keeps_events_when_delivery_fails():
+    events = [get_event(1, OutboxEventTypeEnum.like_created, {"like_id": "1"})]
+    committed = []
+    kafka_producer = get_kafka_producer()
+    kafka_producer.send_messages.side_effect = RuntimeError("broker unavailable")
+    service = get_relay_service(get_pg_repository(events, committed), MagicMock(), kafka_producer)
+
+    assert await service.relay_batch() == 0
+    assert committed == []
+
+
+async def test_relay_batch_keeps_only_events_of_failed_side():
+    user_id = str(uuid.uuid4())
+    events = [
+        get_event(1, OutboxEventTypeEnum.like_created, {"like_id": "1"}, "a:b"),
+        get_event(2, OutboxEventTypeEnum.user_updated, {"user_id": user_id, "telegram_id": 1, "name": "Alice"}),
+    ]
+    committed = []
+    es_repository = MagicMock()
+    es_repository.index_users_documents = AsyncMock(side_effect=RuntimeError("elasticsearch unavailable"))
+    service = get_relay_service(get_pg_repository(events, committed), es_repository, get_kafka_producer())
+
+    # Лайк уже в Kafka, при повторе уйдёт только изменение анкеты
+    assert await service.relay_batch() == 1
+    assert committed == events[:1]
+
+
+async def test_relay_batch_drops_documents_rejected_by_elastic():
+    user_id = str(uuid.uuid4())
+    events = [get_event(1, OutboxEventTypeEnum.user_updated, {"user_id": user_id, "telegram_id": 1, "name": "Alice"})]
+    committed = []
+    es_repository = MagicMock()
+    es_repository.index_users_documents = AsyncMock(return_value={user_id: "mapper_parsing_exception"})
+    service = get_relay_service(get_pg_repository(events, committed), es_repository, get_kafka_producer())
+
+    assert await service.relay_batch() == 1
+    assert committed == events
+
+
+async def test_relay_batch_measures_each_side():
+    events = [get_event(1, OutboxEventTypeEnum.like_created, {"like_id": "1"}, "a:b")]
+    kafka_producer = get_kafka_producer()
+    kafka_producer.send_messages.side_effect = RuntimeError("broker unavailable")
+    service = get_relay_service(get_pg_repository(events, []), MagicMock(), kafka_producer)
+    kafka_stats, elastic_stats = outbox_metrics.kafka.get_stats(), outbox_metrics.elastic.get_stats()
+
+    await service.relay_batch()
+
+    stats = get_outbox_relay_stats()
+    assert stats["kafka"]["flushes"] == kafka_stats["flushes"] + 1
+    assert stats["kafka"]["failed"] == kafka_stats["failed"] + 1
+    # В пачке нет изменений анкет, Elasticsearch не вызывался
+    assert stats["elasticsearch"]["flushes"] == elastic_stats["flushes"]
+
+
+def test_flush_metrics_histogram():
+    metrics = FlushMetrics()
+    for flush_ms in (5, 10, 120, 9000):
+        metrics.observe(flush_ms)
+
+    buckets = metrics.get_stats()["flush_ms_buckets"]
+    assert (buckets["le_10"], buckets["le_250"], buckets["inf"]) == (2, 1, 1)
+    assert sum(buckets.values()) == 4
+
+
+async def test_backlog_stats_are_refreshed_once_per_interval(monkeypatch):
+    monkeypatch.setattr(outbox_metrics, "backlog_checked_at", 0.0)
+    pg_repository = get_pg_repository([], [])
+    pg_repository.get_outbox_backlog = AsyncMock(
+        return_value=OutboxBacklogSchema(pending=42, oldest_age_seconds=12.5)
+    )
+    service = OutboxRelayService(pg_repository, MagicMock(), get_kafka_producer(), MagicMock(), 100, 200, 60_000)
+
+    await service.refresh_backlog_stats()
+    await service.refresh_backlog_stats()
+
+    pg_repository.get_outbox_backlog.assert_awaited_once()
+    stats = get_outbox_relay_stats()
+    assert (stats["pending"], stats["oldest_event_age_seconds"]) == (42, 12.5)
@@ -0,0 +1,83 @@
+import datetime
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from elasticsearch.serializer import JsonSerializer
+
+from app.repositories.profiles_es import ProfilesElasticRepository
+from app.schemas.users import UserSchema
+
+
+def get_es_client(*responses: MagicMock) -> MagicMock:
+    es_client = MagicMock()
+    es_client.options.return_value = es_client
+    es_client.transport.serializers.get_serializer.return_value = JsonSerializer()
+    es_client.bulk = AsyncMock(side_effect=list(responses))
+    return es_client
+
+
+def get_bulk_response(*statuses: tuple[str, int], error_type: str = "error") -> MagicMock:
+    return MagicMock(body={
+        "errors": any(status >= 300 for _, status in statuses),
+        "items": [
+            {"index": {"_index": "users", "_id": document_id, "status": status, "error": {"type": error_type}}}
+            for document_id, status in statuses
+        ],
+    })
+
+
+def get_users(count: int) -> list[UserSchema]:
+    return [UserSchema(user_id=uuid.uuid4(), telegram_id=1, name="User") for _ in range(count)]
+
+
+async def test_index_users_documents_retries_only_transient_errors():
+    users = get_users(3)
+    user_ids = [str(user.user_id) for user in users]
+    es_client = get_es_client(
+        get_bulk_response((user_ids[0], 201), (user_ids[1], 429), (user_ids[2], 400)),
+        get_bulk_response((user_ids[1], 201)),
+    )
+    repository = ProfilesElasticRepository(es_client, max_retries=2, retry_backoff_ms=0)
+
+    rejected = await repository.index_users_documents(users)
+
+    assert list(rejected) == [user_ids[2]]
+    assert es_client.bulk.await_count == 2
+
+
+async def test_index_users_documents_raises_when_retries_exhausted():
+    users = get_users(1)
+    user_id = str(users[0].user_id)
+    es_client = get_es_client(*(get_bulk_response((user_id, 503)) for _ in range(3)))
+    repository = ProfilesElasticRepository(es_client, max_retries=2, retry_backoff_ms=0)
+
+    with pytest.raises(RuntimeError):
+        await repository.index_users_documents(users)
+    assert es_client.bulk.await_count == 3
+
+
+async def test_index_users_documents_keeps_newer_versions_and_waits_out_write_block():
+    updated_at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    users = [UserSchema(user_id=uuid.uuid4(), telegram_id=1, name="User", updated_at=updated_at) for _ in range(2)]
+    user_ids = [str(user.user_id) for user in users]
+    es_client = get_es_client(
+        get_bulk_response((user_ids[0], 409), (user_ids[1], 403), error_type="cluster_block_exception"),
+        get_bulk_response((user_ids[1], 201)),
+    )
+    repository = ProfilesElasticRepository(es_client, max_retries=2, retry_backoff_ms=0)
+
+    assert await repository.index_users_documents(users) == {}
+    assert es_client.bulk.await_count == 2
+    operations = b"".join(es_client.bulk.await_args_list[0].kwargs["operations"])
+    assert f'"version":{int(updated_at.timestamp() * 1000)}'.encode() in operations
+    assert b'"version_type":"external_gte"' in operations
+
+
+def test_user_document_keeps_profile_updated_at():
+    updated_at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    user = UserSchema(user_id=uuid.uuid4(), telegram_id=1, name="User", updated_at=updated_at)
+
+    document = ProfilesElasticRepository._get_user_document(user)
+
+    assert document.updated_at == int(updated_at.timestamp())
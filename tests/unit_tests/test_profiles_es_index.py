@@ -0,0 +1,41 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from elasticsearch import BadRequestError
+
+from app.repositories.profiles_es_index import ProfilesIndexManager
+
+
+def get_index_manager(create_error: Exception) -> ProfilesIndexManager:
+    es_client = MagicMock()
+    es_client.indices.put_index_template = AsyncMock()
+    es_client.indices.exists_alias = AsyncMock(return_value=False)
+    es_client.indices.exists = AsyncMock(return_value=False)
+    es_client.indices.create = AsyncMock(side_effect=create_error)
+    return ProfilesIndexManager(
+        es_client=es_client,
+        logger=MagicMock(),
+        alias="users",
+        refresh_interval="1s",
+        number_of_shards=1,
+        number_of_replicas=0,
+    )
+
+
+async def test_ensure_users_index_tolerates_concurrent_create():
+    index_manager = get_index_manager(
+        BadRequestError(message="resource_already_exists_exception", meta=MagicMock(status=400), body={})
+    )
+
+    await index_manager.ensure_users_index()
+
+    index_manager.es_client.indices.create.assert_awaited_once()
+
+
+async def test_ensure_users_index_raises_other_create_errors():
+    index_manager = get_index_manager(
+        BadRequestError(message="illegal_argument_exception", meta=MagicMock(status=400), body={})
+    )
+
+    with pytest.raises(BadRequestError):
+        await index_manager.ensure_users_index()
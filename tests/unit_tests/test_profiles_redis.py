@@ -0,0 +1,83 @@
+import fakeredis
+import pytest
+
+from app.configs.main import settings
+from app.repositories import profiles_redis
+from app.repositories.profiles_redis import ProfileQueuesRedisRepository
+from app.schemas.feed import RefillLeaseEnum
+
+
+@pytest.fixture
+def repository(monkeypatch) -> ProfileQueuesRedisRepository:
+    # Скрипты выполняются настоящим Lua-интерпретатором fakeredis
+    monkeypatch.setattr(ProfileQueuesRedisRepository, "_instance", None)
+    monkeypatch.setattr(
+        profiles_redis.redis, "from_url", lambda *args, **kwargs: fakeredis.FakeAsyncRedis(decode_responses=True)
+    )
+    return ProfileQueuesRedisRepository()
+
+
+async def test_push_skips_queued_ids_and_respects_max_length(repository, monkeypatch):
+    monkeypatch.setattr(settings.feed, "FEED_QUEUE_MAX_LENGTH", 4)
+
+    await repository.add_to_queue("user", ["a", "b", "a"])
+    await repository.add_to_queue("user", ["b", "c", "d", "e", "f"])
+
+    assert await repository.get_users_queue("user") == ["a", "b", "c", "d"]
+    assert await repository.redis.smembers("queue_members:user") == {"a", "b", "c", "d"}
+
+
+async def test_add_to_queues_deduplicates_each_queue(repository):
+    await repository.add_to_queues({"first": ["a", "b"], "second": ["a"], "third": []})
+    await repository.add_to_queues({"first": ["b", "c"], "second": ["a", "b"]})
+
+    assert await repository.get_users_queues(["first", "second", "third"]) == {
+        "first": ["a", "b", "c"],
+        "second": ["a", "b"],
+        "third": [],
+    }
+
+
+async def test_popped_id_can_be_queued_again(repository):
+    await repository.add_to_queue("user", ["a", "b"])
+
+    queue_pop = await repository.pop_from_queue_with_lease("user", 1, "token", low_watermark=0)
+    await repository.add_to_queue("user", ["a"])
+
+    assert queue_pop.user_ids == ["a"]
+    assert await repository.get_users_queue("user") == ["b", "a"]
+
+
+async def test_pop_takes_lease_only_below_low_watermark(repository):
+    await repository.add_to_queue("user", ["a", "b", "c", "d"])
+
+    queue_pop = await repository.pop_from_queue_with_lease("user", 1, "token", low_watermark=2)
+    assert (queue_pop.user_ids, queue_pop.queue_length, queue_pop.lease) == (["a"], 3, RefillLeaseEnum.not_requested)
+
+    queue_pop = await repository.pop_from_queue_with_lease("user", 2, "token", low_watermark=2)
+    assert (queue_pop.user_ids, queue_pop.queue_length, queue_pop.lease) == (["b", "c"], 1, RefillLeaseEnum.acquired)
+    assert await repository.redis.get("refill_lease:user") == "token"
+    assert 0 < await repository.redis.pttl("refill_lease:user") <= settings.feed.FEED_REFILL_LEASE_TTL * 1000
+
+
+async def test_empty_queue_lease_is_exclusive(repository):
+    first = await repository.pop_from_queue_with_lease("user", 5, "first", low_watermark=0)
+    second = await repository.pop_from_queue_with_lease("user", 5, "second", low_watermark=0)
+    without_lease = await repository.pop_from_queue_with_lease("user", 5, "second", 0, acquire_lease=False)
+
+    assert (first.user_ids, first.lease) == ([], RefillLeaseEnum.acquired)
+    assert (second.user_ids, second.lease) == ([], RefillLeaseEnum.busy)
+    assert without_lease.lease == RefillLeaseEnum.not_requested
+    assert await repository.redis.get("refill_lease:user") == "first"
+
+
+async def test_lease_is_released_only_by_its_owner(repository):
+    await repository.pop_from_queue_with_lease("user", 1, "owner", low_watermark=0)
+
+    await repository.release_refill_lease("user", "stranger")
+    assert await repository.redis.get("refill_lease:user") == "owner"
+
+    await repository.release_refill_lease("user", "owner")
+    assert await repository.redis.get("refill_lease:user") is None
+    queue_pop = await repository.pop_from_queue_with_lease("user", 1, "next", low_watermark=0)
+    assert queue_pop.lease == RefillLeaseEnum.acquired
@@ -0,0 +1,50 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.schemas.likes import LikeCreateSchema
+from app.schemas.users import UserSchema, UserUpdateSchema
+from app.services.profiles import ProfilesService
+from app.services.ranking import get_candidates_ranker
+
+user = UserSchema(user_id=uuid.uuid4(), telegram_id=1, name="Alice", age=30, interests=["music"])
+
+
+def get_service(
+        pg_repository: MagicMock, redis_repository: MagicMock, cache_repository: MagicMock
+) -> ProfilesService:
+    return ProfilesService(
+        profiles_pg_repository=pg_repository,
+        profiles_elastic_repository=MagicMock(),
+        profiles_s3_repository=MagicMock(),
+        profile_queues_redis_repository=redis_repository,
+        profiles_cache_redis_repository=cache_repository,
+        profiles_local_cache=MagicMock(),
+        candidates_ranker=get_candidates_ranker(),
+        logger=MagicMock(),
+    )
+
+
+async def test_update_survives_failed_invalidation_publish():
+    pg_repository = MagicMock()
+    pg_repository.update_user_info = AsyncMock(return_value=user)
+    cache_repository = MagicMock()
+    cache_repository.set_user = AsyncMock()
+    cache_repository.publish_invalidation = AsyncMock(side_effect=RedisConnectionError("redis is down"))
+    service = get_service(pg_repository, MagicMock(), cache_repository)
+
+    assert await service.update_user_info(user.user_id, UserUpdateSchema(name="Alisa")) == user
+    service.profiles_local_cache.invalidate.assert_called_once_with(user.user_id)
+
+
+async def test_like_survives_failed_seen_write():
+    like = MagicMock()
+    pg_repository = MagicMock()
+    pg_repository.create_like = AsyncMock(return_value=like)
+    redis_repository = MagicMock()
+    redis_repository.add_to_seen = AsyncMock(side_effect=RedisConnectionError("redis is down"))
+    service = get_service(pg_repository, redis_repository, MagicMock())
+
+    assert await service.create_like(user.user_id, LikeCreateSchema(liked_user_id=uuid.uuid4())) is like
+    redis_repository.add_to_seen.assert_awaited_once()
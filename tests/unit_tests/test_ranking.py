@@ -0,0 +1,58 @@
+import random
+import time
+import uuid
+
+from app.schemas.users import UserSchema
+from app.services.ranking import CandidatesRanker
+
+ranker = CandidatesRanker(
+    interests_weight=1.0,
+    age_weight=0.5,
+    recency_weight=0.3,
+    distance_weight=0.5,
+    age_scale=5.0,
+    recency_half_life=60 * 60 * 24 * 7,
+    distance_scale=50,
+)
+user = UserSchema(user_id=uuid.uuid4(), telegram_id=1, name="Alice", age=30, interests=["music", "travel", "books"])
+
+
+def test_rank_prefers_interest_overlap_age_and_freshness():
+    now = int(time.time())
+    candidates = [
+        {"user_id": "stale", "interests": ["music", "travel"], "age": 30, "updated_at": now - 60 * 60 * 24 * 365},
+        {"user_id": "stranger", "interests": ["cars"], "age": 55, "updated_at": now},
+        {"user_id": "best", "interests": ["music", "travel"], "age": 30, "updated_at": now},
+        {"user_id": "empty"},
+    ]
+    assert ranker.rank(user, candidates, top_k=3) == ["best", "stale", "stranger"]
+    assert ranker.rank(user, [], top_k=3) == []
+
+
+def test_rank_prefers_closer_candidates():
+    candidates = [
+        {"user_id": "far", "interests": ["music"], "age": 30, "distance": 45.0},
+        {"user_id": "near", "interests": ["music"], "age": 30, "distance": 1.5},
+    ]
+    assert ranker.rank(user, candidates, top_k=2) == ["near", "far"]
+
+
+def test_rank_10k_candidates_benchmark():
+    interests = [f"interest_{i}" for i in range(200)] + ["music", "travel", "books"]
+    now = int(time.time())
+    candidates = [
+        {
+            "user_id": str(uuid.uuid4()),
+            "interests": random.sample(interests, random.randint(0, 8)),
+            "age": random.randint(18, 60),
+            "updated_at": now - random.randint(0, 60 * 60 * 24 * 60),
+        }
+        for _ in range(10_000)
+    ]
+    timings = []
+    for _ in range(5):
+        started_at = time.perf_counter()
+        ranked = ranker.rank(user, candidates, top_k=200)
+        timings.append(time.perf_counter() - started_at)
+    assert len(ranked) == 200
+    assert min(timings) < 0.05
@@ -0,0 +1,32 @@
+import uuid
+from unittest.mock import MagicMock
+
+from app.database import SessionRouter
+
+
+def test_session_router_spreads_reads_over_replicas():
+    primary, first_replica, second_replica = MagicMock(), MagicMock(), MagicMock()
+    router = SessionRouter(primary, [first_replica, second_replica], read_your_writes_window=5)
+    assert router.get_write_session_maker() is primary
+    assert [router.get_read_session_maker() for _ in range(3)] == [first_replica, second_replica, first_replica]
+
+
+def test_session_router_reads_own_writes_from_primary():
+    primary, replica = MagicMock(), MagicMock()
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    router = SessionRouter(primary, [replica], read_your_writes_window=5)
+    router.pin_user(user_id)
+    assert router.get_read_session_maker(user_id) is primary
+    assert router.get_read_session_maker(str(user_id)) is primary
+    assert router.get_read_session_maker(other_user_id) is replica
+
+    expired_router = SessionRouter(primary, [replica], read_your_writes_window=-1)
+    expired_router.pin_user(user_id)
+    assert expired_router.get_read_session_maker(user_id) is replica
+    assert not expired_router.pinned_users
+
+
+def test_session_router_without_replicas_reads_from_primary():
+    primary = MagicMock()
+    router = SessionRouter(primary, [], read_your_writes_window=5)
+    assert router.get_read_session_maker() is primary
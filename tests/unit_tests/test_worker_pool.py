@@ -0,0 +1,39 @@
+import asyncio
+import uuid
+from unittest.mock import MagicMock
+
+from app.brokers.pool import KeyedWorkerPool
+from app.utils import get_pair_key
+
+
+def test_pair_key_does_not_depend_on_direction():
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    assert get_pair_key(user_id, other_user_id) == get_pair_key(other_user_id, user_id)
+
+
+async def test_pool_keeps_order_within_key_and_runs_keys_concurrently():
+    processed = []
+    running = 0
+    max_running = 0
+
+    async def handler(item: tuple[str, int]) -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        # Первые сообщения ключа обрабатываются дольше, обгона быть не должно
+        await asyncio.sleep(0.01 if item[1] == 0 else 0)
+        processed.append(item)
+        running -= 1
+
+    pool = KeyedWorkerPool(handler, MagicMock(), concurrency=4, queue_size=2)
+    pool.start()
+    keys = [f"key-{i}" for i in range(8)]
+    for sequence in range(5):
+        for key in keys:
+            await pool.submit(key, (key, sequence))
+    await pool.close()
+
+    for key in keys:
+        assert [sequence for item_key, sequence in processed if item_key == key] == list(range(5))
+    assert max_running > 1
+    assert pool.get_stats()["processed"] == 40